@@ -1,13 +1,77 @@
 import json
+import logging
+import math
 import os
+import threading
+import time
+import uuid
+from collections import deque
 from datetime import datetime, timedelta, timezone
 
 import redis
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+from . import redis_client, sketch
+from .redis_client import get_client
+
+log = logging.getLogger(__name__)
+
 ANALYTICS_KEY = os.getenv("ANALYTICS_KEY", "")
 EVENT_TTL = 90 * 24 * 60 * 60  # 90 days in seconds
 
+# Raw events: one stream per type. Entry IDs are the write time in ms, the "ts" field
+# the receive time (what timestamps and ranges use), and every XADD trims entries older than EVENT_TTL (approximately, so it stays O(1)).
+STREAM_PREFIX = "events:stream:"
+LEGACY_LIST_PREFIX = "events:"  # pre-stream RPUSH lists, see migrate_event_lists()
+# Longest a queued event is expected to wait for its write (a Redis outage); range reads
+# look this far past `until` for events received in range but written late
+WRITE_LAG_MAX = timedelta(days=1)
+
+# Time-series counters (hash: event_type -> count), coarser buckets live longer
+DAILY_PREFIX = "analytics:daily:"  # + YYYY-MM-DD
+HOURLY_PREFIX = "analytics:hourly:"  # + YYYY-MM-DDTHH
+DAILY_TTL = 2 * 365 * 24 * 60 * 60  # 2 years
+HOURLY_TTL = 14 * 24 * 60 * 60  # 14 days
+HOURLY_SERIES_MAX = 48  # hours; longer time-series ranges are answered from the daily hashes
+
+# Pre-aggregated at ingest so the dashboard never scans the event lists
+TOP_SIGNS_KEY = "analytics:top_signs"  # sorted set: sign_id -> completions
+TOP_LEVELS_KEY = "analytics:top_levels"  # sorted set: level -> starts
+COMP_STATS_KEY = "analytics:comp"  # hash: count, score_sum
+SCORE_MAX = 100000  # same bound as /api/score; anything outside is left out of the score aggregates
+SCORES_PREFIX = "analytics:scores:"  # + date: competition score summary hash, see app/sketch.py
+
+# Unique sessions as HyperLogLogs (~12KB each, ~0.8% error): all-time, per UTC day, per event type
+SESSIONS_KEY = "analytics:sessions:hll"
+LEGACY_SESSIONS_KEY = "analytics:sessions"  # unbounded set, replaced by the HLLs
+
+# Write-behind: /api/track enqueues and a per-worker thread writes to Redis
+ASYNC_WRITES = os.getenv("ANALYTICS_ASYNC", "true").lower() in ("1", "true", "yes")
+QUEUE_MAX = int(os.getenv("ANALYTICS_QUEUE_MAX", "10000"))  # events held per worker
+QUEUE_POLICY = os.getenv("ANALYTICS_QUEUE_POLICY", "drop_newest")  # or drop_oldest, when full
+FLUSH_BATCH = int(os.getenv("ANALYTICS_FLUSH_BATCH", "200"))  # flush as soon as this many are queued
+FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))  # seconds, otherwise
+FLUSH_PIPELINE_MAX = 1000  # events per Redis pipeline
+
+DASHBOARD_DAYS = (7, 30, 90)  # day ranges /api/analytics accepts
+
+EXPORT_CHUNK = 500  # stream entries per XRANGE while exporting
+EXPORT_MAX_EVENTS = int(os.getenv("ANALYTICS_EXPORT_MAX_EVENTS", "100000"))  # per response; resume with the cursor
+
+# /api/analytics serves a snapshot shared by all workers; one worker at a time refreshes it
+SNAPSHOT_MAX_AGE = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", "60"))  # seconds before a refresh
+SNAPSHOT_PREFIX = "analytics:snapshot:"  # + days
+SNAPSHOT_TTL = 24 * 60 * 60  # keep a stale copy around to serve while refreshing
+SNAPSHOT_LOCK_TTL = 30  # seconds; bounds a refresh whose worker died
+SNAPSHOT_WAIT = 2.0  # seconds to wait for another worker's first snapshot
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
 VALID_EVENT_TYPES = {
     "page_view",
     "sign_completed",
@@ -19,120 +83,746 @@ VALID_EVENT_TYPES = {
 }
 
 _client = None
+_release_lock_script = None
 
 
 def _get_client():
     global _client
     if _client is None:
-        _client = redis.from_url(REDIS_URL, decode_responses=True)
+        _client = get_client()
     return _client
 
 
 def track_event(session_id: str, event_type: str, data: dict) -> bool:
     """Log an event to Redis. Returns True on success."""
-    if event_type not in VALID_EVENT_TYPES:
-        return False
+    return track_events([(session_id, event_type, data)])[0]
 
-    r = _get_client()
+
+def track_events(events) -> list:
+    """Log (session_id, event_type, data) tuples to Redis in one pipeline.
+
+    Returns a per-event list of booleans; events with an unknown type are skipped.
+    """
+    results = [event_type in VALID_EVENT_TYPES for _, event_type, _ in events]
+    now = datetime.now(timezone.utc)
+    _write_events(_get_client(), [(*event, now) for event, ok in zip(events, results) if ok])
+    return results
+
+
+def submit_events(events) -> list:
+    """Hand validated events to the write-behind queue (or write them now if async is off).
+
+    Returns a per-event list of booleans; False means the event was dropped.
+    """
+    if not ASYNC_WRITES:
+        return track_events(events)
     now = datetime.now(timezone.utc)
+    return writer.put([(*event, now) for event in events])
+
+
+def _write_events(r, items) -> int:
+    """Write (session_id, event_type, data, received_at) items in one pipeline.
+
+    Redis does not roll back a transaction when one command in it fails, so an item
+    whose commands are rejected is logged and skipped, never replayed with the rest.
+    Returns the number of items skipped; connection errors propagate.
+    """
+    if not items:
+        return 0
+
+    pipe = r.pipeline()
+    spans = []  # (event_type, first command, end) per queued item
+    skipped = 0
+    for session_id, event_type, data, now in items:
+        start = len(pipe)
+        try:
+            _queue_event(pipe, session_id, event_type, data, now)
+        except Exception as e:
+            log.warning(f"Skipping unwritable {event_type} event: {e}")
+            del pipe.command_stack[start:]
+            skipped += 1
+            continue
+        spans.append((event_type, start, len(pipe)))
+    if not spans:
+        return skipped
+
+    replies = pipe.execute(raise_on_error=False)
+    for event_type, start, end in spans:
+        errors = [reply for reply in replies[start:end] if isinstance(reply, Exception)]
+        if errors:
+            log.warning(f"Analytics {event_type} event partly written: {errors[0]}")
+            skipped += 1
+    return skipped
+
+
+def _queue_event(pipe, session_id: str, event_type: str, data: dict, now: datetime):
+    # Append to the per-type stream, dropping entries past the retention window
+    # The ID is the write time; "ts" keeps the receive time, which queued writes can lag behind
+    fields = {"session_id": session_id, "data": json.dumps(data), "ts": _to_ms(now)}
+    pipe.xadd(_stream_key(event_type), fields, minid=_min_id(now), approximate=True)
+
+    # Track unique sessions
     date_str = now.strftime("%Y-%m-%d")
+    pipe.pfadd(SESSIONS_KEY, session_id)
+    pipe.pfadd(_day_sessions_key(date_str), session_id)
+    pipe.expire(_day_sessions_key(date_str), EVENT_TTL)
+    pipe.pfadd(_type_sessions_key(event_type), session_id)
+
+    # Increment hourly and daily counters
+    hourly_key = f"{HOURLY_PREFIX}{now.strftime('%Y-%m-%dT%H')}"
+    pipe.hincrby(hourly_key, event_type, 1)
+    pipe.expire(hourly_key, HOURLY_TTL)
+    pipe.hincrby(f"{DAILY_PREFIX}{date_str}", event_type, 1)
+    pipe.expire(f"{DAILY_PREFIX}{date_str}", DAILY_TTL)
+
+    _aggregate(pipe, event_type, data, date_str)
+
+
+class EventWriter:
+    """Bounded per-worker event queue drained into Redis by a background thread.
+
+    The thread flushes when `batch` events are waiting or every `interval` seconds.
+    A full queue drops the incoming event ("drop_newest") or the oldest queued one
+    ("drop_oldest"); events from a flush that could not reach Redis are put back under
+    the same bound, while events Redis rejected are counted as "skipped".
+    """
+
+    def __init__(self, maxsize: int, batch: int, interval: float, policy: str = "drop_newest"):
+        self.maxsize = maxsize
+        self.batch = batch
+        self.interval = interval
+        self.policy = policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.counters = {"queued": 0, "flushed": 0, "dropped": 0, "skipped": 0, "failed_flushes": 0}
+
+    def put(self, items) -> list:
+        accepted = []
+        with self._cond:
+            self._ensure_thread()
+            for item in items:
+                if len(self._queue) >= self.maxsize:
+                    self.counters["dropped"] += 1
+                    if self.policy != "drop_oldest":
+                        accepted.append(False)
+                        continue
+                    self._queue.popleft()
+                self._queue.append(item)
+                self.counters["queued"] += 1
+                accepted.append(True)
+            if len(self._queue) >= self.batch:
+                self._cond.notify()
+        return accepted
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked child (threads do not survive fork)
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+            self._thread.start()
 
-    event = {
-        "session_id": session_id,
-        "timestamp": now.isoformat(timespec="seconds"),
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping or len(self._queue) >= self.batch, timeout=self.interval)
+                if self._stopping:
+                    return
+            if not self.flush():
+                time.sleep(self.interval)  # Redis is down; don't spin
+
+    def flush(self) -> bool:
+        """Write everything queued so far. Returns False if Redis could not be reached."""
+        with self._flush_lock:
+            with self._cond:
+                items = list(self._queue)
+                self._queue.clear()
+            for start in range(0, len(items), FLUSH_PIPELINE_MAX):
+                chunk = items[start : start + FLUSH_PIPELINE_MAX]
+                try:
+                    skipped = _write_events(_get_client(), chunk)
+                except redis_client.UNAVAILABLE_ERRORS as e:
+                    log.warning(f"Analytics flush failed, requeueing {len(items) - start} events: {e}")
+                    self._requeue(items[start:])
+                    return False
+                except Exception as e:
+                    # Redis answered, so replaying the chunk would only write it twice
+                    log.error(f"Analytics flush failed, dropping {len(chunk)} events: {e}")
+                    skipped = len(chunk)
+                with self._cond:
+                    self.counters["flushed"] += len(chunk) - skipped
+                    self.counters["skipped"] += skipped
+            return True
+
+    def _requeue(self, items):
+        with self._cond:
+            self.counters["failed_flushes"] += 1
+            self._queue.extendleft(reversed(items))
+            while len(self._queue) > self.maxsize:
+                self._queue.popleft()  # oldest first: they are the least useful to keep
+                self.counters["dropped"] += 1
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the thread and write what is left (gunicorn worker_exit hook)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self.counters, "pending": len(self._queue), "async": ASYNC_WRITES, "policy": self.policy}
+
+
+writer = EventWriter(QUEUE_MAX, FLUSH_BATCH, FLUSH_INTERVAL, QUEUE_POLICY)
+
+
+def queue_stats() -> dict:
+    return writer.stats()
+
+
+def flush_queue(timeout: float = 5.0):
+    """Flush this worker's pending events before it exits."""
+    writer.shutdown(timeout)
+
+
+def _stream_key(event_type: str) -> str:
+    return f"{STREAM_PREFIX}{event_type}"
+
+
+def _min_id(now: datetime) -> str:
+    return str(int((now.timestamp() - EVENT_TTL) * 1000))
+
+
+def _to_ms(when: datetime) -> int:
+    return int(when.timestamp() * 1000)
+
+
+def _event_ms(entry_id: str, fields: dict) -> int:
+    """When the event was received: its "ts" field, or the ID for entries written without one."""
+    try:
+        return int(fields["ts"])
+    except (KeyError, TypeError, ValueError):
+        return int(entry_id.split("-", 1)[0])
+
+
+def _entry_to_event(event_type: str, entry_id: str, fields: dict) -> dict:
+    """Stream entry -> the event dict the dashboard and export use."""
+    ms = _event_ms(entry_id, fields)
+    try:
+        data = json.loads(fields.get("data") or "{}")
+    except json.JSONDecodeError:
+        data = {}
+    return {
+        "id": entry_id,
+        "session_id": fields.get("session_id"),
+        "timestamp": datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec="seconds"),
         "event_type": event_type,
         "data": data,
     }
 
-    pipe = r.pipeline()
 
-    # Append to per-type list and refresh TTL
-    list_key = f"events:{event_type}"
-    pipe.rpush(list_key, json.dumps(event))
-    pipe.expire(list_key, EVENT_TTL)
+def iter_events(event_type: str, since: datetime = None, until: datetime = None, chunk: int = 1000, after: str = None):
+    """Yield events of one type received in [since, until] in write order, reading the stream in chunks.
 
-    # Track unique sessions
-    pipe.sadd("analytics:sessions", session_id)
+    An event is written no earlier than it was received, so IDs from `since` on cover
+    the range, up to WRITE_LAG_MAX past `until`. `after` is a stream ID to resume from
+    (exclusive).
+    """
+    start = str(_to_ms(since)) if since else "-"
+    if after and (start == "-" or _id_tuple(after) >= _id_tuple(start)):
+        start = f"({after}"
+    end = str(_to_ms(until + WRITE_LAG_MAX)) if until else "+"
+    since_ms = _to_ms(since) if since else None
+    until_ms = _to_ms(until) if until else None
+    for entry_id, fields in _iter_raw_stream(_get_client(), _stream_key(event_type), start, end, chunk):
+        ms = _event_ms(entry_id, fields)
+        if (since_ms is None or ms >= since_ms) and (until_ms is None or ms <= until_ms):
+            yield _entry_to_event(event_type, entry_id, fields)
 
-    # Increment daily counter
-    pipe.hincrby(f"analytics:daily:{date_str}", event_type, 1)
 
-    pipe.execute()
-    return True
+def _id_tuple(entry_id: str) -> tuple:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def parse_export_cursor(cursor: str):
+    """Split an export cursor "<event_type>:<stream id>"; raises ValueError if malformed."""
+    event_type, _, entry_id = (cursor or "").partition(":")
+    if event_type not in VALID_EVENT_TYPES:
+        raise ValueError("invalid cursor")
+    _id_tuple(entry_id)  # ValueError unless "<ms>-<seq>"
+    return event_type, entry_id
+
+
+def export_events(types, since: datetime = None, until: datetime = None, cursor=None, limit: int = EXPORT_MAX_EVENTS):
+    """Yield NDJSON lines for events of `types` in [since, until], type by type, oldest first.
+
+    Memory stays flat: the streams are read EXPORT_CHUNK entries at a time. Every line
+    carries its "cursor"; if `limit` lines were sent and more may follow, a final
+    {"next_cursor": ...} line says where to resume (pass it back as ?cursor=).
+    """
+    types = sorted(types)
+    resume_type, resume_id = cursor or (None, None)
+    last_cursor = f"{resume_type}:{resume_id}" if cursor else None
+    sent = 0
+    for event_type in types:
+        if resume_type and event_type < resume_type:
+            continue
+        after = resume_id if event_type == resume_type else None
+        for event in iter_events(event_type, since, until, chunk=EXPORT_CHUNK, after=after):
+            if sent >= limit:
+                yield json.dumps({"next_cursor": last_cursor}) + "\n"
+                return
+            last_cursor = event["cursor"] = f"{event_type}:{event['id']}"
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+            sent += 1
+
+
+def _iter_stream(r, event_type: str, start: str = "-", end: str = "+", chunk: int = 1000):
+    for entry_id, fields in _iter_raw_stream(r, _stream_key(event_type), start, end, chunk):
+        yield _entry_to_event(event_type, entry_id, fields)
+
+
+def _iter_raw_stream(r, key: str, start: str = "-", end: str = "+", chunk: int = 1000):
+    while True:
+        entries = r.xrange(key, min=start, max=end, count=chunk)
+        yield from entries
+        if len(entries) < chunk:
+            return
+        start = f"({entries[-1][0]}"  # exclusive: continue after the last entry read
+
+
+def _day_sessions_key(date_str: str) -> str:
+    return f"{SESSIONS_KEY}:{date_str}"
+
+
+def _type_sessions_key(event_type: str) -> str:
+    return f"{SESSIONS_KEY}:type:{event_type}"
 
 
-def get_analytics() -> dict:
-    """Aggregate and return analytics data."""
+def _competition_score(data: dict):
+    """The event's score as a float, or None unless it is finite and within 0..SCORE_MAX."""
+    try:
+        score = float(data.get("score"))
+    except (TypeError, ValueError):
+        return None
+    return score if math.isfinite(score) and 0 <= score <= SCORE_MAX else None
+
+
+def _aggregate(pipe, event_type: str, data: dict, date_str: str):
+    """Queue the ingest-time aggregate updates for one event."""
+    if event_type == "sign_completed":
+        pipe.zincrby(TOP_SIGNS_KEY, 1, str(data.get("sign_id", "unknown")))
+    elif event_type == "level_started":
+        pipe.zincrby(TOP_LEVELS_KEY, 1, str(data.get("level", "unknown")))
+    elif event_type == "competition_attempt":
+        score = _competition_score(data)
+        if score is None:
+            return
+        pipe.hincrby(COMP_STATS_KEY, "count", 1)
+        pipe.hincrbyfloat(COMP_STATS_KEY, "score_sum", score)
+
+        scores_key = f"{SCORES_PREFIX}{date_str}"
+        for name in sketch.fields_for(score):
+            pipe.hincrby(scores_key, name, 1)
+        pipe.hincrby(scores_key, "n", 1)
+        pipe.hincrbyfloat(scores_key, "sum", score)
+        pipe.expire(scores_key, DAILY_TTL)
+
+
+def get_analytics(days: int = 30) -> dict:
+    """Aggregate and return analytics data for the last `days` days.
+
+    Every read is queued on one pipeline, so the dashboard costs a single round trip.
+    """
     r = _get_client()
+    types = sorted(VALID_EVENT_TYPES)
+    today = datetime.now(timezone.utc).date()
+    dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(max(days, 30))]
+    day_keys = [_day_sessions_key(d) for d in dates]
+
+    pipe = r.pipeline(transaction=False)
+    pipe.pfcount(SESSIONS_KEY)
+    for event_type in types:
+        pipe.xlen(_stream_key(event_type))
+    for date_str in dates[:days]:
+        pipe.hgetall(f"{DAILY_PREFIX}{date_str}")
+    for key in day_keys[:days]:
+        pipe.pfcount(key)
+    # A multi-key PFCOUNT merges the day HLLs server-side, like PFMERGE into a scratch key
+    pipe.pfcount(*day_keys[:7])
+    pipe.pfcount(*day_keys[:30])
+    for event_type in types:
+        pipe.pfcount(_type_sessions_key(event_type))
+    for event_type in types:
+        pipe.xrevrange(_stream_key(event_type), count=10)
+    pipe.zrevrange(TOP_SIGNS_KEY, 0, 9, withscores=True)
+    pipe.zrevrange(TOP_LEVELS_KEY, 0, 4, withscores=True)
+    pipe.hgetall(COMP_STATS_KEY)
+    for date_str in dates[:days]:
+        pipe.hgetall(f"{SCORES_PREFIX}{date_str}")
+    replies = iter(pipe.execute())
 
     result = {
-        "unique_sessions": r.scard("analytics:sessions"),
+        "days": days,
+        "unique_sessions": next(replies),
         "events": {},
         "daily": {},
         "recent": [],
     }
 
     # Total count per event type
-    for event_type in VALID_EVENT_TYPES:
-        result["events"][event_type] = r.llen(f"events:{event_type}")
+    for event_type in types:
+        result["events"][event_type] = next(replies)
 
-    # Daily stats — last 30 days
-    today = datetime.now(timezone.utc).date()
-    for i in range(30):
-        date = today - timedelta(days=i)
-        date_str = date.strftime("%Y-%m-%d")
-        day_data = r.hgetall(f"analytics:daily:{date_str}")
+    # Daily stats
+    for date_str in dates[:days]:
+        day_data = next(replies)
         if day_data:
             result["daily"][date_str] = {k: int(v) for k, v in day_data.items()}
 
-    # Recent events — last 10 per type, sorted by timestamp, top 20 total
+    # Unique sessions per day, per rolling window and per event type
+    result["unique_sessions_daily"] = {}
+    for date_str in dates[:days]:
+        count = next(replies)
+        if count:
+            result["unique_sessions_daily"][date_str] = count
+    result["unique_sessions_7d"] = next(replies)
+    result["unique_sessions_30d"] = next(replies)
+    result["unique_sessions_by_type"] = {event_type: next(replies) for event_type in types}
+
+    # Recent events — last 10 per type, newest first by stream ID, top 20 total
     recent = []
-    for event_type in VALID_EVENT_TYPES:
-        for raw in r.lrange(f"events:{event_type}", -10, -1):
-            try:
-                recent.append(json.loads(raw))
-            except json.JSONDecodeError:
-                pass
+    for event_type in types:
+        recent.extend(_entry_to_event(event_type, entry_id, fields) for entry_id, fields in next(replies))
 
-    recent.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
+    recent.sort(key=lambda e: (e["timestamp"], tuple(map(int, e["id"].split("-")))), reverse=True)
     result["recent"] = recent[:20]
 
-    # Top 10 most practiced signs
-    sign_counts = {}
-    for raw in r.lrange("events:sign_completed", 0, -1):
-        try:
-            event = json.loads(raw)
-            sign_id = event.get("data", {}).get("sign_id", "unknown")
-            sign_counts[sign_id] = sign_counts.get(sign_id, 0) + 1
-        except json.JSONDecodeError:
-            pass
-    result["top_signs"] = sorted(sign_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-    # Top 5 most started levels
-    level_counts = {}
-    for raw in r.lrange("events:level_started", 0, -1):
-        try:
-            event = json.loads(raw)
-            level = str(event.get("data", {}).get("level", "unknown"))
-            level_counts[level] = level_counts.get(level, 0) + 1
-        except json.JSONDecodeError:
-            pass
-    result["top_levels"] = sorted(level_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    # Top 10 most practiced signs / top 5 most started levels
+    result["top_signs"] = [(sign, int(n)) for sign, n in next(replies)]
+    result["top_levels"] = [(level, int(n)) for level, n in next(replies)]
 
     # Competition stats
-    comp_scores = []
-    for raw in r.lrange("events:competition_attempt", 0, -1):
-        try:
-            event = json.loads(raw)
-            score = event.get("data", {}).get("score")
-            if score is not None:
-                comp_scores.append(float(score))
-        except (json.JSONDecodeError, ValueError):
-            pass
-    result["comp_count"] = len(comp_scores)
-    result["comp_avg_score"] = round(sum(comp_scores) / len(comp_scores), 2) if comp_scores else 0
+    comp = next(replies)
+    comp_count = int(comp.get("count", 0))
+    result["comp_count"] = comp_count
+    result["comp_avg_score"] = round(float(comp.get("score_sum", 0)) / comp_count, 2) if comp_count else 0
+
+    # Score distribution over the selected days, merged from the per-day summaries
+    result["comp_scores"] = sketch.describe(sketch.merge(next(replies) for _ in dates[:days]))
 
     # Quiz count
-    result["quiz_count"] = r.llen("events:quiz_attempt")
+    result["quiz_count"] = result["events"]["quiz_attempt"]
 
     return result
+
+
+def get_analytics_snapshot(days: int = 30) -> dict:
+    """Return get_analytics(days) from the shared snapshot, refreshing it when older than SNAPSHOT_MAX_AGE.
+
+    Refresh is single-flight: the worker that takes the lock recomputes, the others
+    keep serving the previous snapshot (marked "stale") until the new one lands.
+    """
+    r = _get_client()
+    key = f"{SNAPSHOT_PREFIX}{days}"
+    cached = _load_snapshot(r.get(key))
+    if cached and time.time() - cached["generated_ts"] <= SNAPSHOT_MAX_AGE:
+        return _with_age(cached, stale=False)
+
+    lock = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if r.set(lock, token, nx=True, ex=SNAPSHOT_LOCK_TTL):
+        try:
+            snapshot = {**get_analytics(days), "generated_ts": time.time()}
+            r.set(key, json.dumps(snapshot), ex=SNAPSHOT_TTL)
+            return _with_age(snapshot, stale=False)
+        finally:
+            _release_lock(r, lock, token)
+
+    if cached:
+        return _with_age(cached, stale=True)
+
+    # No snapshot yet and someone else is building it: wait briefly rather than pile on
+    deadline = time.monotonic() + SNAPSHOT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        cached = _load_snapshot(r.get(key))
+        if cached:
+            return _with_age(cached, stale=False)
+    return _with_age({**get_analytics(days), "generated_ts": time.time()}, stale=False)
+
+
+def _load_snapshot(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+def _with_age(snapshot: dict, stale: bool) -> dict:
+    generated = datetime.fromtimestamp(snapshot["generated_ts"], timezone.utc)
+    return {**snapshot, "generated_at": generated.isoformat(timespec="seconds"), "max_age": SNAPSHOT_MAX_AGE, "stale": stale}
+
+
+def _release_lock(r, lock: str, token: str):
+    global _release_lock_script
+    if _release_lock_script is None:
+        _release_lock_script = r.register_script(RELEASE_LOCK_LUA)
+    _release_lock_script(keys=[lock], args=[token], client=r)
+
+
+def get_timeseries(since: datetime, until: datetime) -> dict:
+    """Event counts per type over [since, until], read from the coarsest keys that fit.
+
+    Ranges up to HOURLY_SERIES_MAX hours (still within hourly retention) come from the
+    hourly hashes, anything longer from the daily ones, so a query touches at most
+    max(HOURLY_SERIES_MAX, days in range) keys, in one pipeline.
+    """
+    # The hourly and daily keys are UTC, so bucket boundaries must be too
+    since, until = (t.astimezone(timezone.utc) if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (since, until))
+    now = datetime.now(timezone.utc)
+    hours = (until - since).total_seconds() / 3600
+    if hours <= HOURLY_SERIES_MAX and now - since <= timedelta(seconds=HOURLY_TTL):
+        resolution, step, prefix, fmt = "hour", timedelta(hours=1), HOURLY_PREFIX, "%Y-%m-%dT%H"
+        start = since.replace(minute=0, second=0, microsecond=0)
+    else:
+        resolution, step, prefix, fmt = "day", timedelta(days=1), DAILY_PREFIX, "%Y-%m-%d"
+        start = since.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    labels = []
+    while start <= until:
+        labels.append(start.strftime(fmt))
+        start += step
+
+    pipe = _get_client().pipeline(transaction=False)
+    for label in labels:
+        pipe.hgetall(f"{prefix}{label}")
+    points = [[label, {k: int(v) for k, v in counts.items()}] for label, counts in zip(labels, pipe.execute())]
+    return {"resolution": resolution, "points": points}
+
+
+def compact(now: datetime = None) -> dict:
+    """Maintenance job (cron, see tools/compact_analytics.py); safe to re-run.
+
+    - Rolls completed days that have hourly data but no daily hash up into the daily hash.
+    - Trims raw events past EVENT_TTL from every stream, including ones no longer written to
+      (XADD only trims the stream it appends to).
+    - Gives daily hashes written before they had a TTL one, counted from their own date.
+    """
+    r = _get_client()
+    now = now or datetime.now(timezone.utc)
+    result = {"rolled_up": 0, "trimmed": 0, "expiry_set": 0}
+
+    # Completed days still covered by hourly data; an hour of grace for late flushes
+    last_complete = (now - timedelta(hours=1)).date() - timedelta(days=1)
+    for i in range(HOURLY_TTL // 86400):
+        day = last_complete - timedelta(days=i)
+        date_str = day.strftime("%Y-%m-%d")
+        if r.exists(f"{DAILY_PREFIX}{date_str}"):
+            continue
+        pipe = r.pipeline(transaction=False)
+        for hour in range(24):
+            pipe.hgetall(f"{HOURLY_PREFIX}{date_str}T{hour:02d}")
+        totals = {}
+        for counts in pipe.execute():
+            for event_type, n in counts.items():
+                totals[event_type] = totals.get(event_type, 0) + int(n)
+        if totals:
+            expire_at = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(seconds=DAILY_TTL)
+            pipe = r.pipeline()
+            pipe.hset(f"{DAILY_PREFIX}{date_str}", mapping=totals)
+            pipe.expireat(f"{DAILY_PREFIX}{date_str}", expire_at)
+            pipe.execute()
+            result["rolled_up"] += 1
+
+    for event_type in VALID_EVENT_TYPES:
+        result["trimmed"] += r.xtrim(_stream_key(event_type), minid=_min_id(now), approximate=False)
+
+    for prefix in (DAILY_PREFIX, SCORES_PREFIX):
+        for key in r.scan_iter(match=f"{prefix}*", count=500):
+            if r.ttl(key) != -1:
+                continue
+            try:
+                day = datetime.strptime(key[len(prefix) :], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            r.expireat(key, day + timedelta(seconds=DAILY_TTL))
+            result["expiry_set"] += 1
+    return result
+
+
+def backfill_aggregates() -> dict:
+    """One-off: rebuild the ingest-time aggregates from the raw event streams.
+
+    For data tracked before the aggregates existed. Reads the streams in chunks and
+    replaces the aggregate keys (score summaries only for days still in the streams),
+    so it is safe to re-run.
+    """
+    r = _get_client()
+    sign_counts, level_counts = {}, {}
+    comp_count, comp_sum = 0, 0.0
+    day_scores = {}  # date -> summary fields
+    for event_type in ("sign_completed", "level_started", "competition_attempt"):
+        for event in _iter_stream(r, event_type):
+            data = event.get("data") or {}
+            if event_type == "sign_completed":
+                sign = str(data.get("sign_id", "unknown"))
+                sign_counts[sign] = sign_counts.get(sign, 0) + 1
+            elif event_type == "level_started":
+                level = str(data.get("level", "unknown"))
+                level_counts[level] = level_counts.get(level, 0) + 1
+            else:
+                score = _competition_score(data)
+                if score is None:
+                    continue
+                comp_sum += score
+                comp_count += 1
+                summary = day_scores.setdefault(event["timestamp"][:10], {})
+                for name in sketch.fields_for(score):
+                    summary[name] = summary.get(name, 0) + 1
+                summary["n"] = summary.get("n", 0) + 1
+                summary["sum"] = summary.get("sum", 0) + score
+
+    pipe = r.pipeline()
+    pipe.delete(TOP_SIGNS_KEY, TOP_LEVELS_KEY, COMP_STATS_KEY)
+    if sign_counts:
+        pipe.zadd(TOP_SIGNS_KEY, sign_counts)
+    if level_counts:
+        pipe.zadd(TOP_LEVELS_KEY, level_counts)
+    if comp_count:
+        pipe.hset(COMP_STATS_KEY, mapping={"count": comp_count, "score_sum": comp_sum})
+    for date_str, summary in day_scores.items():
+        pipe.delete(f"{SCORES_PREFIX}{date_str}")
+        pipe.hset(f"{SCORES_PREFIX}{date_str}", mapping=summary)
+    pipe.execute()
+    return {"signs": sum(sign_counts.values()), "levels": sum(level_counts.values()), "competitions": comp_count}
+
+
+def _iter_list_events(r, key: str, chunk: int = 1000):
+    start = 0
+    while True:
+        batch = r.lrange(key, start, start + chunk - 1)
+        for raw in batch:
+            try:
+                yield json.loads(raw)
+            except json.JSONDecodeError:
+                pass
+        if len(batch) < chunk:
+            return
+        start += chunk
+
+
+def migrate_sessions(delete_legacy: bool = False) -> dict:
+    """One-off: fold the legacy analytics:sessions set into the all-time HLL and
+    rebuild the per-day / per-type HLLs from the event streams. Safe to re-run.
+    """
+    r = _get_client()
+    imported = 0
+    batch = []
+    for session_id in r.sscan_iter(LEGACY_SESSIONS_KEY, count=1000):
+        batch.append(session_id)
+        if len(batch) >= 1000:
+            imported += len(batch)
+            r.pfadd(SESSIONS_KEY, *batch)
+            batch = []
+    if batch:
+        imported += len(batch)
+        r.pfadd(SESSIONS_KEY, *batch)
+
+    replayed = 0
+    for event_type in VALID_EVENT_TYPES:
+        pipe = r.pipeline()
+        for event in _iter_stream(r, event_type):
+            session_id = event.get("session_id")
+            if not session_id:
+                continue
+            pipe.pfadd(SESSIONS_KEY, session_id)
+            pipe.pfadd(_type_sessions_key(event_type), session_id)
+            date_str = str(event.get("timestamp", ""))[:10]
+            if date_str:
+                pipe.pfadd(_day_sessions_key(date_str), session_id)
+                pipe.expire(_day_sessions_key(date_str), EVENT_TTL)
+            replayed += 1
+            if len(pipe) >= 4000:
+                pipe.execute()
+        pipe.execute()
+
+    if delete_legacy:
+        r.delete(LEGACY_SESSIONS_KEY)
+    return {"sessions": imported, "events": replayed}
+
+
+def migrate_event_lists() -> dict:
+    """One-off: move the legacy events:<type> lists into the streams, keeping their timestamps.
+
+    Legacy events get IDs from their own timestamps, so they are written into a
+    scratch stream first, followed by the (newer) live entries, and the scratch
+    stream is swapped in under WATCH so nothing written meanwhile is lost.
+    """
+    r = _get_client()
+    moved = {}
+    for event_type in sorted(VALID_EVENT_TYPES):
+        list_key = f"{LEGACY_LIST_PREFIX}{event_type}"
+        if r.type(list_key) != "list":
+            continue
+        stream_key = _stream_key(event_type)
+        scratch = f"{stream_key}:import"
+        r.delete(scratch)
+
+        head = r.xrange(stream_key, count=1)
+        head_ms = int(head[0][0].split("-")[0]) if head else None
+        events = []
+        for event in _iter_list_events(r, list_key):
+            try:
+                ms = _to_ms(datetime.fromisoformat(event["timestamp"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if head_ms is not None:
+                ms = min(ms, head_ms - 1)  # the live stream must stay strictly newer
+            events.append((ms, event))
+        events.sort(key=lambda e: e[0])
+
+        pipe = r.pipeline(transaction=False)
+        last_ms, seq = None, 0
+        for ms, event in events:
+            seq = seq + 1 if ms == last_ms else 0
+            last_ms = ms
+            fields = {"session_id": event.get("session_id") or "", "data": json.dumps(event.get("data") or {})}
+            pipe.xadd(scratch, fields, id=f"{ms}-{seq}")
+            if len(pipe) >= 1000:
+                pipe.execute()
+        pipe.execute()
+
+        # Copy the live entries, then the last few plus the swap atomically
+        last_id = None
+        for entry_id, fields in _iter_raw_stream(r, stream_key):
+            r.xadd(scratch, fields, id=entry_id)
+            last_id = entry_id
+        while True:
+            with r.pipeline() as tx:
+                try:
+                    tx.watch(stream_key)
+                    tail = tx.xrange(stream_key, min=f"({last_id}" if last_id else "-")
+                    tx.multi()
+                    for entry_id, fields in tail:
+                        tx.xadd(scratch, fields, id=entry_id)
+                    if events or tail or last_id:
+                        tx.rename(scratch, stream_key)
+                    tx.delete(list_key)
+                    tx.execute()
+                    break
+                except redis.WatchError:
+                    continue
+        moved[event_type] = len(events)
+    return moved
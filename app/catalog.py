@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+
+# Parsed catalog files keyed by path -> ((mtime_ns, size), value).
+# Each worker re-parses a file only when its stat stamp changes.
+_cache = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Payload:
+    """A JSON response body serialized once, with its strong ETag."""
+
+    body: bytes
+    etag: str
+
+
+def serialize(obj) -> Payload:
+    body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Payload(body=body, etag=hashlib.sha256(body).hexdigest()[:32])
+
+
+def _expand(sid: str, signs_meta: dict) -> dict:
+    return {"id": sid, **(signs_meta.get(sid, {"label": sid}))}
+
+
+@dataclass
+class ManifestIndex:
+    """Lookup tables built once per manifest version."""
+
+    levels: list
+    level_by_id: dict
+    level_signs: dict
+    # Levels 1..n share one ordered-unique sign list; level n owns its first cumulative_len[n] entries
+    cumulative_order: list
+    cumulative_len: dict
+    signs: list
+    _payloads: dict = field(default_factory=dict, repr=False)
+
+    def cumulative_signs(self, n: int) -> list:
+        """Expanded signs from all levels with id <= n, in first-appearance order."""
+        return self.cumulative_order[: self.cumulative_len[n]]
+
+    def payload(self, key, build) -> Payload:
+        """Return the serialized body for `key`, calling build() only on first use."""
+        hit = self._payloads.get(key)
+        if hit is None:
+            hit = self._payloads.setdefault(key, serialize(build()))
+        return hit
+
+
+def build_index(manifest: dict) -> ManifestIndex:
+    levels = manifest.get("levels", [])
+    signs_meta = manifest.get("signs", {})
+
+    level_by_id = {}
+    for level in levels:
+        # First occurrence wins, matching the old linear next() lookup
+        if isinstance(level.get("id"), int):
+            level_by_id.setdefault(level["id"], level)
+
+    records = {sid: _expand(sid, signs_meta) for lvl in levels for sid in lvl.get("signs", [])}
+    level_signs = {lid: [records[sid] for sid in lvl.get("signs", [])] for lid, lvl in level_by_id.items()}
+
+    # Prefix union over levels sorted by id (for distractors): each level only
+    # appends the signs not seen in a lower level, so the whole pass is O(total signs).
+    cumulative_order = []
+    cumulative_len = {}
+    seen = set()
+    ordered = sorted((lvl for lvl in levels if isinstance(lvl.get("id", 0), int)), key=lambda lvl: lvl.get("id", 0))
+    for level in ordered:
+        for sid in level.get("signs", []):
+            if sid not in seen:
+                seen.add(sid)
+                cumulative_order.append(records[sid])
+        cumulative_len[level.get("id", 0)] = len(cumulative_order)
+
+    signs = []
+    for sid, s in signs_meta.items():
+        pics = s.get("pictograms") or ([s["symbol"]] if s.get("symbol") else [])
+        signs.append({"id": sid, "label": s.get("label", sid), "video": s.get("video"), "pictograms": pics})
+    signs.sort(key=lambda x: x["label"].lower())
+
+    return ManifestIndex(
+        levels=levels,
+        level_by_id=level_by_id,
+        level_signs=level_signs,
+        cumulative_order=cumulative_order,
+        cumulative_len=cumulative_len,
+        signs=signs,
+    )
+
+
+def _load_cached(path: str, build):
+    """Return build(parsed_json) for `path`, re-reading only when the file changes.
+
+    Raises FileNotFoundError / json.JSONDecodeError like a plain json.load would.
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _cache.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1]
+
+    with _lock:
+        hit = _cache.get(path)
+        if hit and hit[0] == stamp:
+            return hit[1]
+        with open(path, encoding="utf-8") as f:
+            value = build(json.load(f))
+        _cache[path] = (stamp, value)
+        return value
+
+
+def get_manifest_index(path: str) -> ManifestIndex:
+    """Return the cached ManifestIndex for the manifest at `path`."""
+    return _load_cached(path, build_index)
+
+
+# Combined bodies keyed by their parts' (name, etag) pairs; tiny, so cleared rather than LRU'd
+_combined = {}
+_COMBINED_MAX = 64
+
+
+def combine(parts) -> Payload:
+    """Join already-serialized values into one JSON object without re-encoding them.
+
+    `parts` is a sequence of (name, Payload) pairs whose bodies are JSON values.
+    """
+    key = tuple((name, p.etag) for name, p in parts)
+    hit = _combined.get(key)
+    if hit is None:
+        body = b"{" + b",".join(json.dumps(name).encode("utf-8") + b":" + p.body for name, p in parts) + b"}"
+        if len(_combined) >= _COMBINED_MAX:
+            _combined.clear()
+        hit = _combined[key] = Payload(body=body, etag=hashlib.sha256(body).hexdigest()[:32])
+    return hit
+
+
+EMPTY_DISTRACTORS = serialize({"2": [], "3": [], "meta": {"status": "empty"}})
+
+
+def _build_distractors(data) -> Payload:
+    # Normalize keys to strings "2","3"
+    return serialize({str(k): v for k, v in (data or {}).items()})
+
+
+def get_distractors_payload(path: str) -> Payload:
+    """Return the serialized distractors for `path` (empty placeholder if missing)."""
+    try:
+        return _load_cached(path, _build_distractors)
+    except FileNotFoundError:
+        return EMPTY_DISTRACTORS
@@ -22,6 +22,8 @@ const EVENT_TYPES_ORDERED = [
     "level_completed",
 ];
 
+const DAY_RANGES = [7, 30, 90]; // must match DASHBOARD_DAYS in app/analytics.py
+
 const BAR_COLORS = [
     "bg-blue-500", "bg-purple-500", "bg-green-500", "bg-yellow-400",
     "bg-pink-500", "bg-indigo-500", "bg-orange-500", "bg-teal-500",
@@ -104,6 +106,39 @@ function StatBox({ label, value }) {
     );
 }
 
+// Events per hour for the last 24 hours (served from the hourly counters)
+function HourlyActivity({ analyticsKey }) {
+    const [points, setPoints] = useState([]);
+
+    useEffect(() => {
+        fetch(`/api/analytics/timeseries?key=${encodeURIComponent(analyticsKey)}`)
+            .then((r) => (r.ok ? r.json() : { points: [] }))
+            .then((d) => setPoints(d.points || []))
+            .catch(() => setPoints([]));
+    }, [analyticsKey]);
+
+    const totals = points.map(([, counts]) => Object.values(counts).reduce((a, b) => a + b, 0));
+    const max = Math.max(...totals, 1);
+
+    return (
+        <MetricCard title="Aktivitet senaste 24 timmarna">
+            <div className="flex items-end gap-1 h-24">
+                {points.map(([hour], i) => (
+                    <div key={hour} className="flex-1 h-full flex items-end group relative">
+                        <div
+                            className="w-full rounded-t bg-blue-500"
+                            style={{ height: `${Math.max(Math.round((totals[i] / max) * 100), totals[i] > 0 ? 3 : 0)}%` }}
+                        />
+                        <div className="absolute bottom-full mb-1 left-1/2 -translate-x-1/2 hidden group-hover:block bg-black/80 text-white text-xs rounded px-2 py-1 whitespace-nowrap z-10 pointer-events-none">
+                            {hour.slice(11)}:00 UTC: {totals[i]}
+                        </div>
+                    </div>
+                ))}
+            </div>
+        </MetricCard>
+    );
+}
+
 function BarRow({ label, value, max, color = "bg-blue-500" }) {
     const pct = max > 0 ? Math.round((value / max) * 100) : 0;
     return (
@@ -126,12 +161,13 @@ export default function Analytics() {
     const [data, setData] = useState(null);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState("");
+    const [days, setDays] = useState(30);
 
-    const fetchData = useCallback(async (k) => {
+    const fetchData = useCallback(async (k, d) => {
         setLoading(true);
         setError("");
         try {
-            const res = await fetch(`/api/analytics?key=${encodeURIComponent(k)}`);
+            const res = await fetch(`/api/analytics?key=${encodeURIComponent(k)}&days=${d}`);
             if (res.status === 401) {
                 sessionStorage.removeItem(SESSION_STORAGE_KEY);
                 setKey("");
@@ -147,8 +183,8 @@ export default function Analytics() {
     }, []);
 
     useEffect(() => {
-        if (key) fetchData(key);
-    }, [key, fetchData]);
+        if (key) fetchData(key, days);
+    }, [key, days, fetchData]);
 
     if (!key) return <PasswordGate onUnlock={setKey} />;
 
@@ -177,10 +213,10 @@ export default function Analytics() {
     const maxSign = data ? Math.max(...(data.top_signs || []).map(([, c]) => c), 1) : 1;
     const maxLevel = data ? Math.max(...(data.top_levels || []).map(([, c]) => c), 1) : 1;
 
-    // Last 14 days for bar chart
-    const dailyLabels = Array.from({ length: 14 }, (_, i) => {
+    // Selected day range for bar chart
+    const dailyLabels = Array.from({ length: days }, (_, i) => {
         const d = new Date();
-        d.setDate(d.getDate() - (13 - i));
+        d.setDate(d.getDate() - (days - 1 - i));
         return d.toISOString().slice(0, 10);
     });
 
@@ -197,11 +233,26 @@ export default function Analytics() {
                 <div className="flex items-center justify-between">
                     <div>
                         <h1 className="text-2xl font-bold text-gray-900 dark:text-white">Analytics</h1>
-                        <p className="text-sm text-gray-500 dark:text-gray-400">TAKK Beta Dashboard</p>
+                        <p className="text-sm text-gray-500 dark:text-gray-400">
+                            TAKK Beta Dashboard
+                            {data?.generated_at &&
+                                ` · data från ${new Date(data.generated_at).toLocaleTimeString("sv-SE")}`}
+                        </p>
                     </div>
                     <div className="flex gap-2">
+                        <select
+                            value={days}
+                            onChange={(e) => setDays(Number(e.target.value))}
+                            className="px-3 py-2 bg-white/60 dark:bg-white/10 text-gray-700 dark:text-white rounded-lg text-sm"
+                        >
+                            {DAY_RANGES.map((d) => (
+                                <option key={d} value={d}>
+                                    {d} dagar
+                                </option>
+                            ))}
+                        </select>
                         <button
-                            onClick={() => fetchData(key)}
+                            onClick={() => fetchData(key, days)}
                             disabled={loading}
                             className="px-4 py-2 bg-blue-600 hover:bg-blue-700 text-white rounded-lg text-sm font-medium disabled:opacity-50 transition"
                         >
@@ -234,8 +285,10 @@ export default function Analytics() {
                     <div className="space-y-5">
 
                         {/* Top stat boxes */}
-                        <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
+                        <div className="grid grid-cols-2 md:grid-cols-3 gap-4">
                             <StatBox label="Unika sessioner" value={data.unique_sessions} />
+                            <StatBox label="Unika senaste 7 dagar" value={data.unique_sessions_7d ?? 0} />
+                            <StatBox label="Unika senaste 30 dagar" value={data.unique_sessions_30d ?? 0} />
                             <StatBox label="Totala events" value={totalEvents} />
                             <StatBox label="Events idag" value={todayEvents} />
                             <StatBox label="Events denna vecka" value={weekEvents} />
@@ -262,7 +315,7 @@ export default function Analytics() {
                             </MetricCard>
 
                             {/* Daily activity bar chart */}
-                            <MetricCard title="Aktivitet senaste 14 dagarna">
+                            <MetricCard title={`Aktivitet senaste ${days} dagarna`}>
                                 {/* Legend */}
                                 <div className="grid grid-cols-2 gap-x-4 gap-y-1 mb-3">
                                     {EVENT_TYPES_ORDERED.map((type, i) => (
@@ -273,7 +326,7 @@ export default function Analytics() {
                                     ))}
                                 </div>
                                 {/* Stacked bars */}
-                                <div className="flex items-end gap-1 h-36">
+                                <div className={`flex items-end ${days > 30 ? "gap-px" : "gap-1"} h-36`}>
                                     {dailyLabels.map((d, i) => {
                                         const count = dailyCounts[i];
                                         const pct = Math.round((count / dailyMax) * 100);
@@ -375,10 +428,26 @@ export default function Analytics() {
                                                 </div>
                                             </div>
                                         )}
+                                        {(data.comp_scores?.count ?? 0) > 0 && (
+                                            <div className="col-span-2 grid grid-cols-3 gap-2">
+                                                {["p50", "p90", "p99"].map((p) => (
+                                                    <div key={p}>
+                                                        <div className="text-lg font-bold text-gray-900 dark:text-white">
+                                                            {data.comp_scores[p].toFixed(2)}
+                                                        </div>
+                                                        <div className="text-xs text-gray-500 dark:text-gray-400 mt-1">
+                                                            {p} senaste {days} dagarna
+                                                        </div>
+                                                    </div>
+                                                ))}
+                                            </div>
+                                        )}
                                     </div>
                                 </MetricCard>
                             </div>
 
+                            <HourlyActivity analyticsKey={key} />
+
                             {/* Recent activity feed — full width */}
                             <MetricCard title="Senaste aktivitet">
                                 <div className="space-y-2 max-h-80 overflow-y-auto pr-1">
@@ -7,6 +7,7 @@ import VideoPlayer from "./VideoPlayer.jsx";
 import AppShellCompetition from "./AppShellCompetition.jsx";
 import mouthCoords from "../../../catalog/mouth_coordinates.json";
 import { trackPageView, trackCompetitionAttempt } from "./utils/analytics.js";
+import { fetchBootstrap } from "./lib/bootstrap.js";
 
 export default function Competition() {
     const [phase, setPhase] = useState("name"); // name | play | end
@@ -19,6 +20,7 @@ export default function Competition() {
     const [showOverlay, setShowOverlay] = useState(false);
     const [scores, setScores] = useState([]);
     const [madeTop, setMadeTop] = useState(false);
+    const [rank, setRank] = useState(null); // { rank, percentile, total } from /api/score
     const [order, setOrder] = useState([]); // shuffled order of signs
     const [hasPlayedVideo, setHasPlayedVideo] = useState(false);
     const vRef = useRef(null);
@@ -31,11 +33,10 @@ export default function Competition() {
 
     // Fetch signs + distractors once
     useEffect(() => {
-        Promise.all([fetch("/api/signs"), fetch("/api/distractors")])
-            .then(async ([signsRes, distRes]) => {
-                const signsPayload = await signsRes.json();
-                const distData = await distRes.json();
-                const signsArray = signsPayload.signs || [];
+        fetchBootstrap(["signs", "distractors"])
+            .then((payload) => {
+                const distData = payload.distractors || {};
+                const signsArray = payload.signs || [];
                 const signsMap = {};
                 for (const s of signsArray) {
                     signsMap[s.id] = s;
@@ -149,6 +150,7 @@ export default function Competition() {
 
             setScores(data.scores || []);
             setMadeTop(!!data.madeTop);
+            setRank(data.rank || null);
             setShowOverlay(true);
         } catch (err) {
             console.error("Score submit failed:", err);
@@ -167,6 +169,7 @@ export default function Competition() {
         setChoices([]);
         setShowOverlay(false);
         setMadeTop(false);
+        setRank(null);
         setScores([]);
         setLastCorrect(null);
         setPhase("name"); // switch back to name entry last
@@ -282,6 +285,7 @@ export default function Competition() {
                         setShowOverlay={setShowOverlay}
                         score={score}
                         madeTop={madeTop}
+                        rank={rank}
                         correctAnswer={lastCorrect}
                         resetGame={resetGame}
                     />
@@ -291,7 +295,7 @@ export default function Competition() {
     }
 }
 
-function Scoreboard({ scores, showOverlay, setShowOverlay, score, madeTop, correctAnswer, resetGame }) {
+function Scoreboard({ scores, showOverlay, setShowOverlay, score, madeTop, rank, correctAnswer, resetGame }) {
     return (
         <div className="relative">
             <Card className="p-5 space-y-3 w-full text-center shadow-lg text-gray-900 dark:text-white">    
@@ -335,6 +339,11 @@ function Scoreboard({ scores, showOverlay, setShowOverlay, score, madeTop, corre
                                 Bra jobbat! Försök igen för att nå topplistan.
                             </p>
                         )}
+                        {!madeTop && rank && (
+                            <p className="text-sm opacity-80">
+                                Du kom på plats {rank.rank} av {rank.total}.
+                            </p>
+                        )}
 
                         <Button variant="outline" onClick={() => setShowOverlay(false)}>
                             Stäng
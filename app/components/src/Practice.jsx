@@ -4,14 +4,13 @@ import Button from "./ui/Button.jsx";
 import Card from "./ui/Card.jsx";
 import AppShell from "./AppShell.jsx";
 import HomeButton from "./ui/HomeButton.jsx";
+import { fetchBootstrap } from "./lib/bootstrap.js";
 
-/* Levels list fed by /api/levels (unchanged) */
+/* Levels list fed by /api/bootstrap (levels + version in one request) */
 function GameLevels() {
     const [levels, setLevels] = useState(null);
     useEffect(() => {
-        fetch("/api/levels")
-            .then((r) => r.json())
-            .then((d) => setLevels(d.levels || []));
+        fetchBootstrap(["levels", "version"]).then((d) => setLevels(d.levels || []));
     }, []);
     return (
         <AppShell title="Nivåer">
@@ -39,9 +38,7 @@ function LevelDetail() {
     const nav = useNavigate();
     const [level, setLevel] = useState(null);
     useEffect(() => {
-        fetch(`/api/levels/${n}`)
-            .then((r) => r.json())
-            .then(setLevel);
+        fetchBootstrap(["level", "version"], { level: n }).then((d) => setLevel(d.level));
     }, [n]);
 
     if (!level?.id)
@@ -1,14 +1,12 @@
 // src/VersionDisplay.jsx
 import { useEffect, useState } from 'react';
+import { loadVersion } from './lib/bootstrap.js';
 
 export function VersionDisplay() {
   const [version, setVersion] = useState('');
   
   useEffect(() => {
-    fetch('/api/version')
-      .then(r => r.json())
-      .then(data => setVersion(data.version))
-      .catch(() => setVersion('unknown'));
+    loadVersion().then(setVersion);
   }, []);
   
   if (!version) return null;
@@ -0,0 +1,23 @@
+// One-request cold start: /api/bootstrap returns the selected catalog parts together.
+let versionSource = null; // pending bootstrap response that includes "version"
+let versionPromise = null;
+
+export function fetchBootstrap(fields, params = {}) {
+    const query = new URLSearchParams({ fields: fields.join(","), ...params });
+    const request = fetch(`/api/bootstrap?${query}`).then((r) => r.json());
+    if (fields.includes("version") && !versionSource) versionSource = request;
+    return request;
+}
+
+// Resolves the app version once per page load. Deferred by a microtask so that a
+// page's own bootstrap (started in a parent effect, which runs after this child's
+// effect) can carry the version instead of a separate request.
+export function loadVersion() {
+    if (!versionPromise) {
+        versionPromise = Promise.resolve()
+            .then(() => versionSource || fetchBootstrap(["version"]))
+            .then((d) => d.version || "unknown")
+            .catch(() => "unknown");
+    }
+    return versionPromise;
+}
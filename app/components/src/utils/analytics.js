@@ -21,22 +21,73 @@ function getOrCreateSessionId() {
     return id;
 }
 
-async function trackEvent(eventType, data = {}) {
+// Events are buffered and sent in batches: on an interval, when the buffer is
+// full, and via sendBeacon when the page is hidden (which also covers unload).
+const FLUSH_INTERVAL_MS = 10000;
+const MAX_BATCH = 20;
+const MAX_QUEUE = 50; // server accepts up to 50 per request; older events are dropped beyond that
+
+let queue = [];
+let flushTimer = null;
+
+// Put unsent events back (ahead of newer ones) so the next flush retries them.
+function requeue(events) {
+    queue = events.concat(queue).slice(-MAX_QUEUE);
+}
+
+function sendBeacon(body) {
+    try {
+        if (typeof navigator === "undefined" || typeof navigator.sendBeacon !== "function") return false;
+        // text/plain is CORS-safelisted; a Blob of another type makes Chromium throw.
+        // The server parses the body as JSON regardless of its Content-Type.
+        return navigator.sendBeacon("/api/track", new Blob([body], { type: "text/plain" }));
+    } catch {
+        return false;
+    }
+}
+
+function flush({ beacon = false } = {}) {
+    if (flushTimer) {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+    }
+    if (queue.length === 0) return;
+    const events = queue;
+    queue = [];
+    const body = JSON.stringify({ session_id: getOrCreateSessionId(), events });
+    if (beacon && sendBeacon(body)) return;
+    // Tracking failures are silent — never surface errors to users
     try {
-        await fetch("/api/track", {
+        fetch("/api/track", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                session_id: getOrCreateSessionId(),
-                event_type: eventType,
-                data,
-            }),
-        });
+            body,
+            keepalive: beacon,
+        })
+            .then((r) => {
+                if (r.status >= 500) requeue(events); // queue full or Redis down; 4xx would fail again
+            })
+            .catch(() => requeue(events));
     } catch {
-        // Tracking failures are silent — never surface errors to users
+        requeue(events);
+    }
+}
+
+function trackEvent(eventType, data = {}) {
+    queue.push({ event_type: eventType, data });
+    if (queue.length >= MAX_BATCH) {
+        flush();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flush, FLUSH_INTERVAL_MS);
     }
 }
 
+if (typeof document !== "undefined") {
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") flush({ beacon: true });
+    });
+}
+
 export const trackPageView = (page) => trackEvent("page_view", { page });
 export const trackSignCompleted = (signId, mode) => trackEvent("sign_completed", { sign_id: signId, mode });
 export const trackQuizAttempt = (level, total) => trackEvent("quiz_attempt", { level, total });
@@ -0,0 +1,155 @@
+"""Append-only feedback store: one JSON object per line in feedback.jsonl.
+
+Every write takes an exclusive flock and appends a single line, so concurrent workers
+cannot drop each other's entries and a submission costs the same at any file size.
+The entry count behind the cap is cached per process and only advanced over the bytes
+appended since the last look. Reads page by byte offset and find a date range by
+binary search, so neither depends on how many entries are stored.
+"""
+
+import fcntl
+import json
+import os
+from datetime import datetime, timezone
+
+MAX_ENTRIES = int(os.getenv("FEEDBACK_MAX_ENTRIES", "1000"))
+PAGE_MAX = 500  # entries per admin read
+
+_counts = {}  # path -> (inode, bytes counted, entries)
+
+
+def _count_entries(f, path: str) -> int:
+    """Entries in the locked file `f`, reading only what was appended since the last call."""
+    st = os.fstat(f.fileno())
+    inode, offset, count = _counts.get(path, (st.st_ino, 0, 0))
+    if inode != st.st_ino or st.st_size < offset:  # replaced or truncated
+        offset, count = 0, 0
+    f.seek(offset)
+    while chunk := f.read(65536):
+        count += chunk.count(b"\n")
+    _counts[path] = (st.st_ino, st.st_size, count)
+    return count
+
+
+def _encode(entry: dict) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def append(path: str, entry: dict, max_entries: int = None) -> bool:
+    """Append `entry` unless the store already holds `max_entries` (MAX_ENTRIES); False if it is full."""
+    if max_entries is None:
+        max_entries = MAX_ENTRIES
+    with open(path, "ab+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        count = _count_entries(f, path)
+        if count >= max_entries:
+            return False
+        line = _encode(entry)
+        f.write(line)
+        f.flush()
+        inode, offset, _ = _counts[path]
+        _counts[path] = (inode, offset + len(line), count + 1)
+    return True
+
+
+def migrate_legacy(legacy_path: str, path: str) -> int:
+    """Move the entries of an old feedback.json array into `path` (tools/migrate_feedback.py).
+
+    The array is appended under the store lock and the old file is then renamed to
+    "<name>.migrated", so running it again is a no-op. Returns the number of entries moved.
+    """
+    if not os.path.exists(legacy_path):
+        return 0
+    with open(path, "ab+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        if not os.path.exists(legacy_path):  # another worker got here first
+            return 0
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as legacy:
+                entries = json.load(legacy)
+        except json.JSONDecodeError:
+            entries = []
+        f.write(b"".join(_encode(entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+        os.replace(legacy_path, legacy_path + ".migrated")
+    return len(entries)
+
+
+def _timestamp(line: bytes):
+    """Aware datetime of a stored line, or None if the line cannot be read."""
+    try:
+        value = json.loads(line)["timestamp"]
+        parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except (ValueError, KeyError, TypeError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _line_start(f, offset: int) -> int:
+    """Offset of the first line starting at or after `offset`; leaves `f` positioned there."""
+    f.seek(max(offset - 1, 0))
+    if offset:
+        f.readline()
+    return f.tell()
+
+
+def _seek_time(f, size: int, since: datetime) -> int:
+    """Offset of the first line stamped at or after `since`, by binary search over byte offsets.
+
+    Entries are appended in time order, so this takes O(log size) short reads.
+    """
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = _line_start(f, mid)
+        timestamp = _timestamp(f.readline()) if start < size else None
+        if start < size and (timestamp is None or timestamp < since):
+            lo = mid + 1
+        else:
+            hi = mid
+    return _line_start(f, lo)
+
+
+def parse_cursor(value: str) -> int:
+    """A page cursor is the byte offset of the next line; raises ValueError if malformed."""
+    try:
+        offset = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor") from None
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    return offset
+
+
+def read_page(path: str, cursor: int = 0, limit: int = PAGE_MAX, since: datetime = None, until: datetime = None):
+    """Yield stored NDJSON lines from `cursor` on, oldest first, optionally within [since, until].
+
+    Lines are streamed from the file as stored, so the cost depends on `limit`, not on
+    the size of the store. If `limit` lines were sent and more may follow, a final
+    {"next_cursor": ...} line says where to resume. Raises ValueError (on the first
+    next()) if `cursor` does not point at the start of a line.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size  # later appends are left for the next page
+        if cursor > size or cursor != _line_start(f, cursor):
+            raise ValueError("invalid cursor")
+        offset = max(cursor, _seek_time(f, size, since)) if since else cursor
+        f.seek(offset)
+        sent = 0
+        while offset < size:
+            line = f.readline()
+            if not line.endswith(b"\n"):  # still being written
+                return
+            if until is not None:
+                timestamp = _timestamp(line)
+                if timestamp is not None and timestamp > until:
+                    return
+            if sent == limit:
+                yield _encode({"next_cursor": str(offset)})
+                return
+            offset += len(line)
+            yield line
+            sent += 1
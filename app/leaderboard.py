@@ -1,54 +1,405 @@
+import heapq
+import json
+import logging
+import math
 import os
-from datetime import datetime, timezone
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 
-import redis
+from . import redis_client
+from .redis_client import UNAVAILABLE_ERRORS, get_client
+
+log = logging.getLogger(__name__)
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 LEADERBOARD_KEY = "takk:leaderboard"
+VERSION_KEY = "takk:leaderboard:version"  # bumped by every add_score
 MAX_KEEP = 20
+TOP_LIMIT = 10
+CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "30"))  # seconds, fallback if a bump is missed
+CACHE_MAX_BOARDS = 16
+
+# Time-bucketed boards next to the all-time one; buckets are UTC and expire on their own
+WINDOWS = ("all", "day", "week")
+BUCKET_GRACE = timedelta(days=1)  # keep a finished bucket a little while for late readers
+
+# Optional deep retention: a larger board used only for ranking players outside the top list.
+# Capped by count (LEADERBOARD_DEEP_KEEP, 0 = off) and optionally by age in days.
+DEEP_KEY = "takk:leaderboard:deep"
+DEEP_TS_KEY = "takk:leaderboard:deep:ts"  # same members scored by submit time, for age trimming
+DEEP_KEEP = int(os.getenv("LEADERBOARD_DEEP_KEEP", "0"))
+DEEP_MAX_AGE_DAYS = int(os.getenv("LEADERBOARD_DEEP_MAX_AGE_DAYS", "0"))
+DEEP_TRIM_BATCH = 100  # aged-out or excess entries removed per write, so trimming cost stays bounded
+
+# Insert into every board, trim, bump the version and read back in one atomic round trip.
+# KEYS = all-time board, version, deep board, deep timestamps, window buckets...
+# ARGV = member, score, max_keep, limit, deep_keep, deep_min_ts, now_ts,
+#        then one EXPIREAT timestamp per bucket (ARGV[i + 3] belongs to KEYS[i]).
+# Returns {rank of member (0-based, -1 if trimmed away), flat top-N with scores, new version,
+#          [{count above, count below, board size} on the ranking board if the member was kept]}
+ADD_SCORE_LUA = """
+local member, score = ARGV[1], ARGV[2]
+local keep = tonumber(ARGV[3])
+for i = 5, #KEYS do
+  redis.call('ZADD', KEYS[i], score, member)
+  redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -(keep + 1))
+  redis.call('EXPIREAT', KEYS[i], ARGV[i + 3])
+end
+redis.call('ZADD', KEYS[1], score, member)
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(keep + 1))
+
+local ranked = KEYS[1]
+local deep_keep = tonumber(ARGV[5])
+if deep_keep > 0 then
+  ranked = KEYS[3]
+  redis.call('ZADD', KEYS[3], score, member)
+  redis.call('ZADD', KEYS[4], ARGV[7], member)
+  local min_ts = tonumber(ARGV[6])
+  if min_ts > 0 then
+    local old = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', '(' .. min_ts, 'LIMIT', 0, %d)
+    if #old > 0 then
+      redis.call('ZREM', KEYS[3], unpack(old))
+      redis.call('ZREM', KEYS[4], unpack(old))
+    end
+  end
+  local excess = redis.call('ZCARD', KEYS[3]) - deep_keep
+  if excess > 0 then
+    local low = redis.call('ZRANGE', KEYS[3], 0, math.min(excess, %d) - 1)
+    redis.call('ZREM', KEYS[3], unpack(low))
+    redis.call('ZREM', KEYS[4], unpack(low))
+  end
+end
+
+local rank = redis.call('ZREVRANK', KEYS[1], member)
+local top = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[4]) - 1, 'WITHSCORES')
+local version = redis.call('INCR', KEYS[2])
+if not redis.call('ZSCORE', ranked, member) then
+  return {rank or -1, top, version}
+end
+local above = redis.call('ZCOUNT', ranked, '(' .. score, '+inf')
+local below = redis.call('ZCOUNT', ranked, '-inf', '(' .. score)
+return {rank or -1, top, version, {above, below, redis.call('ZCARD', ranked)}}
+""" % (
+    DEEP_TRIM_BATCH,
+    DEEP_TRIM_BATCH,
+)
+
+# Degraded mode: submissions accepted while Redis is unreachable are kept per worker
+# (lowest scores dropped beyond FALLBACK_MAX) and optionally appended to FALLBACK_LOG,
+# then replayed in one pipeline once Redis answers again.
+FALLBACK_MAX = int(os.getenv("LEADERBOARD_FALLBACK_MAX", "500"))
+FALLBACK_LOG = os.getenv("LEADERBOARD_FALLBACK_LOG", "")
+FALLBACK_LOG_MAX_BYTES = FALLBACK_MAX * 256  # past this the log is compacted back to FALLBACK_MAX entries
 
 _client = None
+_add_score_script = None
+
+# Min-heap of (score, member, unix ts) waiting for replay
+_pending = []
+_pending_lock = threading.Lock()
+_fallback_stats = {"buffered": 0, "dropped": 0, "replayed": 0}
+
+# Per-worker top-N cache: (board key, limit) -> (version, fetched_at, entries)
+_top_cache = {}
+_cache_stats = {"hits": 0, "misses": 0}
 
 
 def _get_client():
     global _client
     if _client is None:
-        _client = redis.from_url(REDIS_URL, decode_responses=True)
+        _client = get_client()
     return _client
 
 
+def _bucket(window: str, now: datetime):
+    """Return (key, end) of the `window` bucket containing `now`."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "day":
+        return f"{LEADERBOARD_KEY}:day:{now.strftime('%Y-%m-%d')}", midnight + timedelta(days=1)
+    if window == "week":
+        year, week, weekday = now.isocalendar()
+        return f"{LEADERBOARD_KEY}:week:{year}-W{week:02d}", midnight + timedelta(days=8 - weekday)
+    raise ValueError("unknown window")
+
+
+def window_key(window: str = "all", now: datetime = None) -> str:
+    """Return the Redis key holding the board for `window` ("all", "day" or "week")."""
+    if window == "all":
+        return LEADERBOARD_KEY
+    return _bucket(window, now or datetime.now(timezone.utc))[0]
+
+
+def _rank_info(above: int, below: int, total: int) -> dict:
+    """1-based rank (ties share the best place) and the share of scores strictly below."""
+    return {"rank": above + 1, "percentile": round(100 * below / total, 1) if total else 0.0, "total": total}
+
+
+def _ranked_key() -> str:
+    return DEEP_KEY if DEEP_KEEP > 0 else LEADERBOARD_KEY
+
+
+def _parse_entries(pairs):
+    entries = []
+    for member, score in pairs:
+        date, _, name = member.partition("|")
+        entries.append({"name": name, "score": round(float(score), 2), "date": date})
+    return entries
+
+
 def add_score(name: str, score: float):
-    """Add a score entry and return (top10, made_top)."""
+    """Add a score entry and return (top10, made_top, rank).
+
+    `rank` is {rank, percentile, total} on the ranking board (the deep board when
+    enabled), or None if the entry did not stay on it.
+    """
     if not isinstance(name, str) or not name.strip():
         raise ValueError("name required")
     try:
         score = float(score)
     except Exception:
         raise ValueError("score must be a number")
+    if not math.isfinite(score):
+        raise ValueError("score must be a finite number")  # NaN would also break the fallback heap
 
     name = name.strip()[:32]
     score = round(score, 2)
-    date = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    now = datetime.now(timezone.utc)
+    date = now.isoformat(timespec="seconds")
 
     # Member encodes date + name so the same player can appear multiple times
     member = f"{date}|{name}"
 
     r = _get_client()
-    r.zadd(LEADERBOARD_KEY, {member: score})
-    # Trim to top MAX_KEEP by removing the lowest-scored entries beyond the limit
-    r.zremrangebyrank(LEADERBOARD_KEY, 0, -(MAX_KEEP + 1))
+    try:
+        _replay_pending(r)
+        result = _run_add_script(r, member, score, now)
+    except UNAVAILABLE_ERRORS:
+        _buffer((score, member, int(now.timestamp())))
+        top10 = _approximate_top(LEADERBOARD_KEY, TOP_LIMIT)
+        return top10, any(e["date"] == date and e["name"] == name for e in top10), None
 
-    top10 = get_top(limit=10)
-    made_top = any(e["name"] == name and e["score"] == score for e in top10)
-    return top10, made_top
+    rank, flat, version = result[:3]
+    rank_info = _rank_info(*(int(n) for n in result[3])) if len(result) > 3 else None
 
+    top10 = _parse_entries(zip(flat[::2], flat[1::2]))
+    # The script hands back the board it just wrote, so this worker starts warm
+    _top_cache.clear()
+    _top_cache[(LEADERBOARD_KEY, TOP_LIMIT)] = (str(version), time.monotonic(), top10)
+    made_top = 0 <= int(rank) < TOP_LIMIT
+    return top10, made_top, rank_info
 
-def get_top(limit: int = 10):
-    """Return the top `limit` scores as a list of {name, score, date} dicts."""
-    r = _get_client()
-    results = r.zrevrange(LEADERBOARD_KEY, 0, max(0, int(limit)) - 1, withscores=True)
-    entries = []
-    for member, score in results:
-        date, _, name = member.partition("|")
-        entries.append({"name": name, "score": round(score, 2), "date": date})
+
+def _run_add_script(client, member: str, score: float, now: datetime):
+    """Run ADD_SCORE_LUA for one entry; `client` may be a pipeline."""
+    global _add_score_script
+    if _add_score_script is None:
+        _add_score_script = _get_client().register_script(ADD_SCORE_LUA)
+    buckets = [_bucket(w, now) for w in WINDOWS if w != "all"]
+    now_ts = int(now.timestamp())
+    deep_min_ts = now_ts - DEEP_MAX_AGE_DAYS * 86400 if DEEP_MAX_AGE_DAYS > 0 else 0
+    keys = [LEADERBOARD_KEY, VERSION_KEY, DEEP_KEY, DEEP_TS_KEY] + [key for key, _ in buckets]
+    args = [member, score, MAX_KEEP, TOP_LIMIT, DEEP_KEEP, deep_min_ts, now_ts]
+    args += [int((end + BUCKET_GRACE).timestamp()) for _, end in buckets]
+    return _add_score_script(keys=keys, args=args, client=client)
+
+
+def _buffer(entry, log: bool = True):
+    """Keep a (score, member, ts) submission for replay; lowest scores go first when full."""
+    with _pending_lock:
+        if len(_pending) < FALLBACK_MAX:
+            heapq.heappush(_pending, entry)
+        else:
+            heapq.heappushpop(_pending, entry)  # the lowest score cannot matter for the board
+            _fallback_stats["dropped"] += 1
+    if log:
+        _fallback_stats["buffered"] += 1
+        if FALLBACK_LOG:
+            _append_log([entry])
+
+
+def _write_log(path: str, entries, mode: str = "a"):
+    with open(path, mode, encoding="utf-8") as f:
+        for score, member, ts in entries:
+            f.write(json.dumps({"score": score, "member": member, "ts": ts}, ensure_ascii=False) + "\n")
+
+
+def _append_log(entries):
+    try:
+        _write_log(FALLBACK_LOG, entries)
+        if os.path.getsize(FALLBACK_LOG) > FALLBACK_LOG_MAX_BYTES:
+            _compact_log()
+    except OSError:
+        pass  # the in-memory copy still gets replayed
+
+
+def _read_log(path: str):
+    """Return (entries, bad lines); a torn or corrupt line is skipped, not fatal."""
+    entries, bad = [], 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                entry = (float(row["score"]), row["member"], int(row["ts"]))
+            except (ValueError, KeyError, TypeError):
+                bad += 1
+                continue
+            if math.isfinite(entry[0]):
+                entries.append(entry)
+            else:
+                bad += 1
+    return entries, bad
+
+
+def _compact_log():
+    """Rewrite the log with its FALLBACK_MAX best entries, the ones the heap would keep.
+
+    An append racing the rename can be lost from the file; it is still in that worker's heap.
+    """
+    entries, _ = _read_log(FALLBACK_LOG)
+    best = heapq.nlargest(FALLBACK_MAX, {member: (score, member, ts) for score, member, ts in entries}.values())
+    tmp = f"{FALLBACK_LOG}.compact-{os.getpid()}"
+    _write_log(tmp, best, "w")
+    os.replace(tmp, FALLBACK_LOG)
+
+
+def _take_log():
+    """Claim the on-disk log (renamed first, so concurrent appends start a new file)."""
+    if not FALLBACK_LOG or not os.path.exists(FALLBACK_LOG):
+        return []
+    claimed = f"{FALLBACK_LOG}.replay-{os.getpid()}"
+    try:
+        os.replace(FALLBACK_LOG, claimed)
+    except OSError:
+        return []
+    try:
+        entries, bad = _read_log(claimed)
+    except OSError:
+        entries, bad = [], 0
+    finally:
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+    _fallback_stats["dropped"] += bad
     return entries
+
+
+def _replay_pending(r):
+    """Write buffered submissions back to Redis in one pipeline.
+
+    Members are date|name, so an entry replayed twice (memory + log, or by two
+    workers) just rewrites the same member.
+    """
+    if not _pending and not (FALLBACK_LOG and os.path.exists(FALLBACK_LOG)):
+        return
+    # During an outage leave the buffer alone, so requests do no per-entry file or heap work
+    if redis_client.breaker.is_open():
+        return
+    r.ping()  # claim the log and the heap only once Redis answers
+    with _pending_lock:
+        buffered = list(_pending)
+        _pending.clear()
+    logged = _take_log()
+    entries = list({member: (score, member, ts) for score, member, ts in buffered + logged}.values())
+    valid = [entry for entry in entries if math.isfinite(entry[0])]  # a log from before the check may hold NaN
+    if not valid:
+        _fallback_stats["dropped"] += len(entries)
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for score, member, ts in valid:
+            _run_add_script(pipe, member, score, datetime.fromtimestamp(ts, timezone.utc))
+        replies = pipe.execute(raise_on_error=False)
+    except UNAVAILABLE_ERRORS:
+        for entry in buffered:
+            _buffer(entry, log=False)
+        if logged:
+            _append_log(logged)
+        raise
+    # Entries Redis rejected would fail again on every replay, so they are dropped
+    errors = [reply for reply in replies if isinstance(reply, Exception)]
+    if errors:
+        log.warning(f"Dropped {len(errors)} buffered scores Redis rejected: {errors[0]}")
+    _fallback_stats["replayed"] += len(valid) - len(errors)
+    _fallback_stats["dropped"] += len(entries) - len(valid) + len(errors)
+
+
+def _approximate_top(key: str, limit: int):
+    """Best local guess at a board while Redis is down: last cached copy plus buffered entries."""
+    cached = max((hit[2] for (k, _), hit in _top_cache.items() if k == key), key=len, default=[])
+    with _pending_lock:
+        pending = list(_pending)
+    merged = {(e["date"], e["name"]): e for e in cached}
+    for score, member, ts in pending:
+        when = datetime.fromtimestamp(ts, timezone.utc)
+        if key == LEADERBOARD_KEY or key in (_bucket(w, when)[0] for w in WINDOWS if w != "all"):
+            entry = _parse_entries([(member, score)])[0]
+            merged[(entry["date"], entry["name"])] = entry
+    ranked = sorted(merged.values(), key=lambda e: (e["score"], f"{e['date']}|{e['name']}"), reverse=True)
+    return ranked[:limit] if limit else ranked
+
+
+def get_top(limit: int = TOP_LIMIT, window: str = "all"):
+    """Return the top `limit` scores of `window` as a list of {name, score, date} dicts.
+
+    Served from the worker-local cache while Redis reports the same board
+    version; only the tiny version key is read on a hit.
+    """
+    if window not in WINDOWS:
+        raise ValueError("unknown window")
+    limit = max(0, int(limit))
+    key = window_key(window)
+    r = _get_client()
+    try:
+        _replay_pending(r)
+        hit = _top_cache.get((key, limit))
+        if hit and time.monotonic() - hit[1] < CACHE_TTL and r.get(VERSION_KEY) == hit[0]:
+            _cache_stats["hits"] += 1
+            return list(hit[2])
+
+        _cache_stats["misses"] += 1
+        pipe = r.pipeline()  # MULTI, so the version matches the board it is stored with
+        pipe.get(VERSION_KEY)
+        pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        version, results = pipe.execute()
+    except UNAVAILABLE_ERRORS:
+        return _approximate_top(key, limit)
+    entries = _parse_entries(results)
+    if version is not None:
+        if len(_top_cache) >= CACHE_MAX_BOARDS:
+            _top_cache.clear()  # boards of rolled-over buckets would otherwise linger
+        _top_cache[(key, limit)] = (version, time.monotonic(), entries)
+    return list(entries)
+
+
+def rank_of_score(score: float) -> dict:
+    """Return where `score` would place on the ranking board, without storing it.
+
+    Two ZCOUNTs and a ZCARD in one round trip: O(log n), no range reads.
+    """
+    try:
+        score = round(float(score), 2)
+    except Exception:
+        raise ValueError("score must be a number")
+    if not math.isfinite(score):
+        raise ValueError("score must be a finite number")
+
+    key = _ranked_key()
+    pipe = _get_client().pipeline(transaction=False)
+    pipe.zcount(key, f"({score}", "+inf")
+    pipe.zcount(key, "-inf", f"({score}")
+    pipe.zcard(key)
+    above, below, total = pipe.execute()
+    return _rank_info(above, below, total)
+
+
+def cache_stats() -> dict:
+    """Return this worker's top-N cache counters."""
+    return {**_cache_stats, "size": len(_top_cache)}
+
+
+def fallback_stats() -> dict:
+    """Return this worker's degraded-mode counters and how many entries await replay."""
+    return {**_fallback_stats, "pending": len(_pending)}
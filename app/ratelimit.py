@@ -0,0 +1,165 @@
+"""Request rate limiting with pluggable backends.
+
+- RedisWindowBackend: sliding-window counter shared by all workers, one script call per check.
+- TokenBucketBackend: in-process token buckets, for a single process or as the fallback
+  while Redis is unavailable.
+
+Limits are per identifier prefix ("score", "track", ...) and can be overridden with
+RATE_LIMIT_<PREFIX>="<requests>/<seconds>", e.g. RATE_LIMIT_TRACK="120/60".
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import redis_client
+
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis")  # or "memory"
+MEMORY_MAX_KEYS = int(os.getenv("RATE_LIMIT_MEMORY_MAX_KEYS", "10000"))  # per worker
+KEY_PREFIX = "takk:ratelimit:"
+
+# prefix -> (requests, window seconds)
+DEFAULT_LIMIT = (10, 60)
+DEFAULT_LIMITS = {
+    "score": (10, 60),
+    "feedback": (10, 60),
+    "feedback_read": (30, 60),
+    "track": (60, 60),  # analytics events are more frequent
+    "analytics": (5, 60),
+    "timeseries": (10, 60),
+    "export": (10, 60),
+    "metrics": (10, 60),
+}
+
+# KEYS: current window counter, previous window counter
+# ARGV: limit, weight of the previous window (share of it still inside the sliding window), ttl
+SLIDING_WINDOW_LUA = """
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + count >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+def parse_limit(value: str) -> tuple:
+    """Parse "<requests>/<seconds>" into (requests, seconds)."""
+    requests, _, seconds = value.partition("/")
+    return int(requests), int(seconds or 60)
+
+
+def load_limits() -> dict:
+    limits = dict(DEFAULT_LIMITS)
+    for prefix in DEFAULT_LIMITS:
+        value = os.getenv(f"RATE_LIMIT_{prefix.upper()}")
+        if value:
+            limits[prefix] = parse_limit(value)
+    return limits
+
+
+class TokenBucketBackend:
+    """Per-key token buckets: `limit` tokens, refilled continuously over `window` seconds.
+
+    Buckets are kept in least-recently-used order and bounded by `max_keys`. A bucket
+    untouched for a whole window is full again, i.e. the same as a new one, so those
+    are swept lazily from the cold end; past `max_keys` the coldest bucket is dropped.
+    """
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, last refill (monotonic), window]
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def allow(self, key: str, limit: int, window: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit), now, window]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evicted_lru += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit / window)
+                bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def _sweep(self, now: float):
+        # Amortised O(1): each bucket is evicted at most once, and the scan stops at the first live one
+        while self._buckets:
+            _, (_, last, window) = next(iter(self._buckets.items()))
+            if now - last < window:
+                return
+            self._buckets.popitem(last=False)
+            self.evicted_idle += 1
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys, "evicted_idle": self.evicted_idle, "evicted_lru": self.evicted_lru}
+
+
+class RedisWindowBackend:
+    """Sliding-window counter: this window's count plus the previous window's, weighted by overlap."""
+
+    def __init__(self):
+        self._script = None
+
+    def allow(self, key: str, limit: int, window: int) -> bool:
+        r = redis_client.get_client()
+        if self._script is None:
+            self._script = r.register_script(SLIDING_WINDOW_LUA)
+        now = time.time()
+        current = int(now // window)
+        weight = 1 - (now % window) / window
+        keys = [f"{KEY_PREFIX}{key}:{current}", f"{KEY_PREFIX}{key}:{current - 1}"]
+        return bool(self._script(keys=keys, args=[limit, weight, window * 2], client=r))
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RateLimiter:
+    """Checks `prefix`/identifier pairs against per-prefix limits.
+
+    With a Redis backend, checks fall back to the in-process buckets while Redis is
+    unavailable, so requests are still limited (per worker) rather than refused.
+    """
+
+    def __init__(self, backend, limits: dict = None, fallback=None):
+        self.backend = backend
+        self.fallback = fallback
+        self.limits = limits if limits is not None else load_limits()
+        self.fallbacks = 0
+
+    def allow(self, prefix: str, identifier: str) -> bool:
+        limit, window = self.limits.get(prefix, DEFAULT_LIMIT)
+        key = f"{prefix}:{identifier}"
+        if self.fallback is None:
+            return self.backend.allow(key, limit, window)
+        try:
+            return self.backend.allow(key, limit, window)
+        except redis_client.UNAVAILABLE_ERRORS:
+            self.fallbacks += 1
+            return self.fallback.allow(key, limit, window)
+
+    def stats(self) -> dict:
+        stats = {"backend": type(self.backend).__name__, **self.backend.stats()}
+        if self.fallback is not None:
+            stats["fallback"] = {"used": self.fallbacks, **self.fallback.stats()}
+        return stats
+
+
+def from_env() -> RateLimiter:
+    if BACKEND == "memory":
+        return RateLimiter(TokenBucketBackend())
+    return RateLimiter(RedisWindowBackend(), fallback=TokenBucketBackend())
@@ -0,0 +1,143 @@
+"""Shared, timeout-bounded Redis client for the leaderboard and analytics modules."""
+
+import os
+import threading
+import time
+
+import redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))  # seconds
+SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0"))  # seconds, per command
+HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))  # seconds
+BREAKER_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", "3"))  # consecutive failures to open
+BREAKER_COOLDOWN = float(os.getenv("REDIS_BREAKER_COOLDOWN", "5"))  # seconds before a trial call
+
+# Errors that mean "Redis is not there" (as opposed to a bad command)
+UNAVAILABLE_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
+
+class RedisUnavailable(redis.ConnectionError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets a trial call through after `cooldown`."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold and time.monotonic() - self.opened_at < self.cooldown
+
+    def before_call(self):
+        if self.is_open():
+            with self._lock:
+                self.rejected += 1
+            raise RedisUnavailable("Redis circuit breaker open")
+
+    def record_success(self):
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"open": self.is_open(), "failures": self.failures, "rejected": self.rejected}
+
+
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+# Per-command latency: name -> {"count", "errors", "total_ms", "max_ms"}
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(name: str, elapsed_ms: float, failed: bool):
+    with _metrics_lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        m["count"] += 1
+        m["errors"] += failed
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+
+
+def _guarded(name: str, call, *args, **kwargs):
+    breaker.before_call()
+    start = time.perf_counter()
+    failed = False
+    try:
+        result = call(*args, **kwargs)
+    except UNAVAILABLE_ERRORS:
+        failed = True
+        breaker.record_failure()
+        raise
+    except redis.RedisError:
+        failed = True  # Redis answered, so it is healthy
+        breaker.record_success()
+        raise
+    finally:
+        _record(name, (time.perf_counter() - start) * 1000, failed)
+    breaker.record_success()
+    return result
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        return _guarded("PIPELINE", super().execute, raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.Redis that times every command and honours the circuit breaker."""
+
+    def execute_command(self, *args, **options):
+        return _guarded(str(args[0]).upper(), super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> redis.Redis:
+    """Return this worker's shared Redis client (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                pool = redis.BlockingConnectionPool.from_url(
+                    REDIS_URL,
+                    max_connections=POOL_SIZE,
+                    timeout=SOCKET_TIMEOUT,  # wait for a free connection no longer than for a reply
+                    socket_connect_timeout=CONNECT_TIMEOUT,
+                    socket_timeout=SOCKET_TIMEOUT,
+                    health_check_interval=HEALTH_CHECK_INTERVAL,
+                    decode_responses=True,
+                )
+                _client = InstrumentedRedis(connection_pool=pool)
+    return _client
+
+
+def stats() -> dict:
+    """Return breaker state and per-command latency for this worker."""
+    with _metrics_lock:
+        commands = {
+            name: {**m, "avg_ms": round(m["total_ms"] / m["count"], 3), "total_ms": round(m["total_ms"], 3), "max_ms": round(m["max_ms"], 3)}
+            for name, m in _metrics.items()
+        }
+    return {"breaker": breaker.stats(), "commands": commands}
@@ -1,33 +1,58 @@
 # app/routes.py
 import json
+import math
+import mimetypes
 import os
-import time
-from collections import defaultdict
+import stat
+import uuid
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-
-from flask import Blueprint, abort, current_app, jsonify, request, send_from_directory
-
-from .analytics import ANALYTICS_KEY, VALID_EVENT_TYPES, get_analytics, track_event
-from .leaderboard import add_score, get_top
+from urllib.parse import quote
+
+import redis
+from flask import Blueprint, Response, abort, current_app, jsonify, request, send_from_directory
+from werkzeug.utils import send_file
+
+from . import feedback, ratelimit, redis_client
+from .analytics import (
+    ANALYTICS_KEY,
+    DASHBOARD_DAYS,
+    EXPORT_MAX_EVENTS,
+    VALID_EVENT_TYPES,
+    export_events,
+    get_analytics_snapshot,
+    get_timeseries,
+    parse_export_cursor,
+    queue_stats,
+    submit_events,
+)
+from .catalog import combine, get_distractors_payload, get_manifest_index, serialize
+from .leaderboard import WINDOWS, add_score, cache_stats, fallback_stats, get_top, rank_of_score
 from .version import __version__
 
 main_bp = Blueprint("main", __name__)
 
-# Simple in-memory rate limiting
-rate_limit_store = defaultdict(list)
-RATE_LIMIT_WINDOW = 60  # seconds
-RATE_LIMIT_MAX_REQUESTS = 10  # max requests per window
-TRACK_RATE_LIMIT_MAX_REQUESTS = 60  # analytics events are more frequent
+# Per-prefix request limits, shared across workers through Redis (see app/ratelimit.py)
+limiter = ratelimit.from_env()
+TRACK_BATCH_MAX_EVENTS = 50  # per /api/track request in batch mode
+TIMESERIES_MAX_RANGE = timedelta(days=731)  # daily counters are kept for two years
+
+# Media is resolved once; MEDIA_SENDFILE="x-accel" (nginx) or "x-sendfile" hands the bytes to the proxy
+MEDIA_ROOT = (Path(__file__).resolve().parent.parent / "media").resolve()
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = "/_media/"  # internal nginx location, see deployment/nginx-takk.conf
+MEDIA_MAX_AGE = 2592000  # 30 days, as nginx's /media/ location
+
+# Catalog bodies change only with catalog/*.json; clients may keep them but must revalidate
+CATALOG_CACHE_CONTROL = "public, no-cache"
 
+BOOTSTRAP_FIELDS = ("version", "levels", "signs", "distractors")
+VERSION_PAYLOAD = serialize(__version__)
 
-def check_rate_limit(identifier, max_requests=RATE_LIMIT_MAX_REQUESTS):
-    """Simple rate limiter: max N requests per 60 seconds per identifier."""
-    now = time.time()
-    rate_limit_store[identifier] = [t for t in rate_limit_store[identifier] if now - t < RATE_LIMIT_WINDOW]
-    if len(rate_limit_store[identifier]) >= max_requests:
-        return False
-    rate_limit_store[identifier].append(now)
-    return True
+
+def check_rate_limit(prefix, ip):
+    """True if `ip` is still within the configured limit for `prefix` ("score", "track", ...)."""
+    return limiter.allow(prefix, ip or "unknown")
 
 
 def _distractors_path():
@@ -45,12 +70,35 @@ def _manifest_path():
 def _feedback_path():
     package_dir = os.path.dirname(os.path.abspath(__file__))
     project_dir = os.path.dirname(package_dir)
-    return os.path.join(project_dir, "feedback.json")
+    return os.path.join(project_dir, "feedback.jsonl")
 
 
 def _load_manifest():
-    with open(_manifest_path(), encoding="utf-8") as f:
-        return json.load(f)
+    return get_manifest_index(_manifest_path())
+
+
+def _level_payload(m, n):
+    level = m.level_by_id[n]
+    return m.payload(("level", n), lambda: {"id": n, "name": level.get("name"), "signs": m.level_signs[n]})
+
+
+def _catalog_response(payload):
+    """Send a pre-serialized catalog payload, or 304 if the client already has it."""
+    if request.if_none_match.contains_weak(payload.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(payload.body, mimetype="application/json")
+    response.set_etag(payload.etag)
+    response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+    return response
+
+
+@main_bp.errorhandler(redis.ConnectionError)
+@main_bp.errorhandler(redis.TimeoutError)
+def redis_unavailable(e):
+    """Redis down or breaker open: fail fast instead of tying up the worker."""
+    current_app.logger.warning(f"Redis unavailable: {e}")
+    return jsonify({"ok": False, "error": "service unavailable"}), 503
 
 
 @main_bp.get("/api/version")
@@ -60,15 +108,30 @@ def api_version():
 
 @main_bp.get("/api/scores")
 def api_scores():
-    top10 = get_top(limit=10)
-    return jsonify({"scores": top10})
+    window = request.args.get("window", "all")
+    if window not in WINDOWS:
+        return jsonify({"error": "invalid window"}), 400
+    top10 = get_top(limit=10, window=window)
+    return jsonify({"scores": top10, "window": window})
+
+
+@main_bp.get("/api/scores/rank")
+def api_score_rank():
+    """Return the rank and percentile a score would get, without submitting it."""
+    try:
+        score = float(request.args.get("score", ""))
+    except ValueError:
+        return jsonify({"error": "invalid score"}), 400
+    if not math.isfinite(score) or score < 0 or score > 100000:
+        return jsonify({"error": "invalid score"}), 400
+    return jsonify({"score": round(score, 2), **rank_of_score(score)})
 
 
 @main_bp.post("/api/score")
 def api_add_score():
     # Rate limiting by IP
     ip = request.remote_addr
-    if not check_rate_limit(f"score_{ip}"):
+    if not check_rate_limit("score", ip):
         return jsonify({"ok": False, "error": "Too many requests. Try again later."}), 429
 
     data = request.get_json(silent=True) or {}
@@ -91,8 +154,8 @@ def api_add_score():
         return jsonify({"ok": False, "error": "invalid score"}), 400
 
     try:
-        top10, made_top = add_score(name, score_float)
-        return jsonify({"ok": True, "madeTop": made_top, "scores": top10})
+        top10, made_top, rank = add_score(name, score_float)
+        return jsonify({"ok": True, "madeTop": made_top, "scores": top10, "rank": rank})
     except ValueError as e:
         return jsonify({"ok": False, "error": str(e)}), 400
 
@@ -101,7 +164,7 @@ def api_add_score():
 def api_feedback():
     # Rate limiting by IP
     ip = request.remote_addr
-    if not check_rate_limit(f"feedback_{ip}"):
+    if not check_rate_limit("feedback", ip):
         return jsonify({"ok": False, "error": "Too many requests. Try again later."}), 429
 
     data = request.get_json(silent=True) or {}
@@ -114,53 +177,60 @@ def api_feedback():
     if len(message) > 1000:
         return jsonify({"ok": False, "error": "message too long (max 1000 characters)"}), 400
 
-    import uuid
-    from datetime import datetime
-
-    feedback_entry = {"id": str(uuid.uuid4()), "timestamp": datetime.utcnow().isoformat() + "Z", "message": message}
+    feedback_entry = {
+        "id": str(uuid.uuid4()),
+        "timestamp": datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z",
+        "message": message,
+    }
 
-    path = _feedback_path()
+    try:
+        # Cap the store to prevent disk fill (FEEDBACK_MAX_ENTRIES, default 1000)
+        if not feedback.append(_feedback_path(), feedback_entry):
+            return jsonify({"ok": False, "error": "feedback storage full"}), 507
+        return jsonify({"ok": True})
+    except (OSError, ValueError) as e:
+        current_app.logger.error(f"Failed to save feedback: {e}")
+        return jsonify({"ok": False, "error": "server error"}), 500
 
-    # Read existing feedback or start with empty list
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                feedback_list = json.load(f)
-        except json.JSONDecodeError:
-            feedback_list = []
-    else:
-        feedback_list = []
 
-    # Check file size limit (prevent disk fill - max 1000 entries)
-    if len(feedback_list) >= 1000:
-        return jsonify({"ok": False, "error": "feedback storage full"}), 507
+@main_bp.get("/api/feedback")
+def api_feedback_list():
+    """Stored feedback as streamed NDJSON: ?since=&until= (ISO 8601), ?cursor=, ?limit=."""
+    ip = request.remote_addr or "unknown"
+    if not check_rate_limit("feedback_read", ip):
+        return jsonify({"error": "rate limit exceeded"}), 429
 
-    # Append new feedback
-    feedback_list.append(feedback_entry)
+    # Never open: feedback is free text from users
+    if not ANALYTICS_KEY:
+        return jsonify({"error": "feedback requires ANALYTICS_KEY"}), 403
+    if not _analytics_key_ok():
+        return jsonify({"error": "unauthorized"}), 401
 
-    # Write back to file
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(feedback_list, f, indent=2, ensure_ascii=False)
-        return jsonify({"ok": True})
-    except Exception as e:
-        current_app.logger.error(f"Failed to save feedback: {e}")
-        return jsonify({"ok": False, "error": "server error"}), 500
+        since = _parse_time(request.args.get("since"))
+        until = _parse_time(request.args.get("until"))
+        cursor = feedback.parse_cursor(request.args.get("cursor", "0"))
+        limit = int(request.args.get("limit", feedback.PAGE_MAX))
+        if not 1 <= limit <= feedback.PAGE_MAX:
+            raise ValueError(f"limit must be 1..{feedback.PAGE_MAX}")
+        lines = feedback.read_page(_feedback_path(), cursor, limit, since, until)
+        first = next(lines, b"")  # surface a bad cursor while we can still send a status
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def body():
+        yield first
+        yield from lines
+
+    return Response(body(), mimetype="application/x-ndjson", headers={"Cache-Control": "no-store"})
 
 
 @main_bp.get("/api/distractors")
 def api_distractors():
-    path = _distractors_path()
-    if not os.path.exists(path):
-        return jsonify({"2": [], "3": [], "meta": {"status": "empty"}})
-    with open(path, encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {"2": [], "3": []}
-    # Normalize keys to strings "2","3"
-    data = {str(k): v for k, v in (data or {}).items()}
-    return jsonify(data)
+    try:
+        return _catalog_response(get_distractors_payload(_distractors_path()))
+    except json.JSONDecodeError:
+        return jsonify({"2": [], "3": []})
 
 
 @main_bp.get("/health")
@@ -170,36 +240,50 @@ def health():
 
 @main_bp.route("/media/<path:filename>")
 def media(filename):
-    """Serve media files with path traversal protection."""
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    project_dir = os.path.dirname(package_dir)
-    media_dir = os.path.join(project_dir, "media")
-
-    # Sanitize filename to prevent path traversal
-    # Resolve to absolute path and check it's within media_dir
+    """Serve media files with path traversal protection, Range support and revalidation."""
     try:
-        safe_path = Path(media_dir).resolve() / filename
-        safe_path = safe_path.resolve()
-
-        # Ensure the resolved path is within media_dir
-        if not str(safe_path).startswith(str(Path(media_dir).resolve())):
+        safe_path = (MEDIA_ROOT / filename).resolve()
+        # Ensure the resolved path is within the media directory
+        if not safe_path.is_relative_to(MEDIA_ROOT):
             current_app.logger.warning(f"Path traversal attempt: {filename}")
             abort(403)
-
-        # Check file exists
-        if not safe_path.is_file():
-            abort(404)
-
-        return send_from_directory(media_dir, filename)
+        st = safe_path.stat()
     except (ValueError, OSError):
         abort(404)
+    if not stat.S_ISREG(st.st_mode):
+        abort(404)
+
+    if MEDIA_SENDFILE == "x-accel":
+        # nginx sends the bytes (and answers Range/If-None-Match) from its internal location
+        response = current_app.response_class(mimetype=mimetypes.guess_type(safe_path.name)[0] or "application/octet-stream")
+        # Header values go out as latin-1: percent-encode so nginx finds the UTF-8 name ("vänta")
+        response.headers["X-Accel-Redirect"] = MEDIA_ACCEL_PREFIX + quote(safe_path.relative_to(MEDIA_ROOT).as_posix())
+        response.headers["Cache-Control"] = f"public, max-age={MEDIA_MAX_AGE}"
+        return response
+
+    response = send_file(
+        safe_path,
+        request.environ,
+        conditional=True,  # 206 for Range, 304 for If-None-Match / If-Modified-Since
+        etag=f"{st.st_mtime_ns:x}-{st.st_size:x}",
+        last_modified=st.st_mtime,
+        max_age=MEDIA_MAX_AGE,
+        use_x_sendfile=MEDIA_SENDFILE == "x-sendfile",
+        response_class=current_app.response_class,
+    )
+    if MEDIA_SENDFILE == "x-sendfile":
+        # The proxy reads a file path, not a URI: send its UTF-8 bytes (WSGI headers are latin-1 strings)
+        response.headers["X-Sendfile"] = str(safe_path).encode("utf-8").decode("latin-1")
+    # Werkzeug only advertises ranges on 206s; nginx always does, and Safari won't seek video without it
+    response.headers.setdefault("Accept-Ranges", "bytes")
+    return response
 
 
 @main_bp.get("/api/levels")
 def api_levels():
     try:
         m = _load_manifest()
-        return jsonify({"levels": m.get("levels", [])})
+        return _catalog_response(m.payload("levels", lambda: {"levels": m.levels}))
     except FileNotFoundError:
         return jsonify({"levels": []}), 404
     except json.JSONDecodeError:
@@ -215,12 +299,9 @@ def api_level_detail(n: int):
     except json.JSONDecodeError:
         return jsonify({"message": "Data corrupted"}), 500
 
-    level = next((L for L in m.get("levels", []) if L.get("id") == n), None)
-    if not level:
+    if n not in m.level_by_id:
         return jsonify({"error": "level not found"}), 404
-    signs_meta = m.get("signs", {})
-    expanded = [{"id": sid, **(signs_meta.get(sid, {"label": sid}))} for sid in level.get("signs", [])]
-    return jsonify({"id": n, "name": level.get("name"), "signs": expanded})
+    return _catalog_response(_level_payload(m, n))
 
 
 @main_bp.get("/api/levels/<int:n>/cumulative")
@@ -233,35 +314,20 @@ def api_level_cumulative(n: int):
     except json.JSONDecodeError:
         return jsonify({"message": "Data corrupted"}), 500
 
-    # Get the current level info
-    current_level = next((L for L in m.get("levels", []) if L.get("id") == n), None)
+    current_level = m.level_by_id.get(n)
     if not current_level:
         return jsonify({"error": "level not found"}), 404
 
-    signs_meta = m.get("signs", {})
-
-    # Current level signs only (for questions)
-    current_signs = [{"id": sid, **(signs_meta.get(sid, {"label": sid}))} for sid in current_level.get("signs", [])]
-
-    # Collect all sign IDs from levels 1 through n (for distractors)
-    all_sign_ids = []
-    for level in m.get("levels", []):
-        if level.get("id", 0) <= n:
-            all_sign_ids.extend(level.get("signs", []))
-
-    # Remove duplicates
-    seen = set()
-    unique_sign_ids = []
-    for sid in all_sign_ids:
-        if sid not in seen:
-            seen.add(sid)
-            unique_sign_ids.append(sid)
-
-    # Expand all cumulative signs
-    cumulative_signs = [{"id": sid, **(signs_meta.get(sid, {"label": sid}))} for sid in unique_sign_ids]
-
-    return jsonify(
-        {"id": n, "name": current_level.get("name"), "signs": current_signs, "cumulativeSigns": cumulative_signs}  # Only current level  # All levels 1→n
+    return _catalog_response(
+        m.payload(
+            ("cumulative", n),
+            lambda: {
+                "id": n,
+                "name": current_level.get("name"),
+                "signs": m.level_signs[n],  # Only current level (for questions)
+                "cumulativeSigns": m.cumulative_signs(n),  # All levels 1→n (for distractors)
+            },
+        )
     )
 
 
@@ -275,21 +341,58 @@ def api_signs():
     except json.JSONDecodeError:
         return jsonify({"message": "Data corrupted"}), 500
 
-    signs_obj = m.get("signs", {})
-    signs_list = []
-    for sid, s in signs_obj.items():
-        pics = s.get("pictograms") or ([s["symbol"]] if s.get("symbol") else [])
-        signs_list.append(
-            {
-                "id": sid,
-                "label": s.get("label", sid),
-                "video": s.get("video"),
-                "pictograms": pics,
-            }
-        )
+    return _catalog_response(m.payload("signs", lambda: {"signs": m.signs}))
+
 
-    signs_list.sort(key=lambda x: x["label"].lower())
-    return jsonify({"signs": signs_list})
+@main_bp.get("/api/bootstrap")
+def api_bootstrap():
+    """Return several catalog resources in one cacheable body.
+
+    ?fields=version,levels,signs,distractors selects the parts (default: all);
+    ?level=<n> adds that level's detail under "level".
+    """
+    # An empty ?fields= selects the defaults, like leaving it out
+    fields = [f for f in request.args.get("fields", "").split(",") if f] or list(BOOTSTRAP_FIELDS)
+    unknown = [f for f in fields if f not in BOOTSTRAP_FIELDS and f != "level"]
+    if unknown:
+        return jsonify({"error": f"unknown field: {unknown[0]}"}), 400
+    level_id = request.args.get("level")
+    if level_id is not None:
+        try:
+            level_id = int(level_id)
+        except ValueError:
+            return jsonify({"error": "level must be an integer"}), 400
+    if "level" in fields and level_id is None:
+        return jsonify({"error": "level required"}), 400
+    if level_id is not None and "level" not in fields:
+        fields.append("level")
+
+    try:
+        m = _load_manifest() if {"levels", "signs", "level"} & set(fields) else None
+    except FileNotFoundError:
+        return jsonify({"message": "Data not found"}), 404
+    except json.JSONDecodeError:
+        return jsonify({"message": "Data corrupted"}), 500
+
+    parts = []
+    for name in dict.fromkeys(fields):
+        if name == "version":
+            parts.append((name, VERSION_PAYLOAD))
+        elif name == "levels":
+            parts.append((name, m.payload(("value", "levels"), lambda: m.levels)))
+        elif name == "signs":
+            parts.append((name, m.payload(("value", "signs"), lambda: m.signs)))
+        elif name == "distractors":
+            try:
+                parts.append((name, get_distractors_payload(_distractors_path())))
+            except json.JSONDecodeError:
+                parts.append((name, serialize({"2": [], "3": []})))
+        elif name == "level":
+            if level_id not in m.level_by_id:
+                return jsonify({"error": "level not found"}), 404
+            parts.append((name, _level_payload(m, level_id)))
+
+    return _catalog_response(combine(parts))
 
 
 # --- Analytics ---
@@ -298,10 +401,16 @@ def api_signs():
 @main_bp.post("/api/track")
 def api_track():
     ip = request.remote_addr
-    if not check_rate_limit(f"track_{ip}", max_requests=TRACK_RATE_LIMIT_MAX_REQUESTS):
+    if not check_rate_limit("track", ip):
         return jsonify({"ok": False, "error": "Too many requests"}), 429
 
-    data = request.get_json(silent=True) or {}
+    # force=True: navigator.sendBeacon may not send an application/json content type
+    data = request.get_json(force=True, silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "invalid payload"}), 400
+    if "events" in data:
+        return _track_batch(data)
+
     session_id = (data.get("session_id") or "").strip()
     event_type = (data.get("event_type") or "").strip()
     event_data = data.get("data") or {}
@@ -309,41 +418,205 @@ def api_track():
     if not session_id or not event_type:
         return jsonify({"ok": False, "error": "session_id and event_type required"}), 400
 
+    error = _session_error(session_id) or _event_error(event_type, event_data)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+
+    try:
+        if not submit_events([(session_id, event_type, event_data)])[0]:
+            return jsonify({"ok": False, "error": "analytics queue full"}), 503
+        return jsonify({"ok": True})
+    except redis_client.UNAVAILABLE_ERRORS as e:
+        return redis_unavailable(e)
+    except Exception as e:
+        current_app.logger.error(f"Analytics track error: {e}")
+        return jsonify({"ok": False, "error": "server error"}), 500
+
+
+def _session_error(session_id):
     if len(session_id) > 64:
-        return jsonify({"ok": False, "error": "session_id too long"}), 400
+        return "session_id too long"
+    return None
 
-    if event_type not in VALID_EVENT_TYPES:
-        return jsonify({"ok": False, "error": "invalid event_type"}), 400
 
+def _event_error(event_type, event_data):
+    if event_type not in VALID_EVENT_TYPES:
+        return "invalid event_type"
     if not isinstance(event_data, dict):
-        return jsonify({"ok": False, "error": "data must be an object"}), 400
+        return "data must be an object"
+    # Flask's JSON parser accepts 1e999, Infinity and NaN
+    score = event_data.get("score")
+    if isinstance(score, float) and not math.isfinite(score):
+        return "score must be a finite number"
+    return None
+
+
+def _track_batch(data):
+    """{"session_id": ..., "events": [{"event_type": ..., "data": {...}}, ...]} -> per-event results."""
+    session_id = data.get("session_id")
+    session_id = session_id.strip() if isinstance(session_id, str) else ""
+    events = data.get("events")
+    if not session_id:
+        return jsonify({"ok": False, "error": "session_id required"}), 400
+    error = _session_error(session_id)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+    if not isinstance(events, list) or not events:
+        return jsonify({"ok": False, "error": "events must be a non-empty list"}), 400
+    if len(events) > TRACK_BATCH_MAX_EVENTS:
+        return jsonify({"ok": False, "error": f"at most {TRACK_BATCH_MAX_EVENTS} events per batch"}), 400
+
+    results = []
+    valid = []  # (position in results, event)
+    for item in events:
+        item = item if isinstance(item, dict) else {}
+        event_type = item.get("event_type")
+        event_type = event_type.strip() if isinstance(event_type, str) else ""
+        event_data = item.get("data") or {}
+        error = _event_error(event_type, event_data) if event_type else "event_type required"
+        results.append({"ok": False, "error": error} if error else {"ok": True})
+        if not error:
+            valid.append((len(results) - 1, (session_id, event_type, event_data)))
 
     try:
-        track_event(session_id, event_type, event_data)
-        return jsonify({"ok": True})
+        accepted = submit_events([event for _, event in valid]) if valid else []
+    except redis_client.UNAVAILABLE_ERRORS as e:
+        return redis_unavailable(e)
     except Exception as e:
         current_app.logger.error(f"Analytics track error: {e}")
         return jsonify({"ok": False, "error": "server error"}), 500
+    for (pos, _), ok in zip(valid, accepted):
+        if not ok:
+            results[pos] = {"ok": False, "error": "analytics queue full"}
+    return jsonify({"ok": True, "accepted": sum(accepted), "results": results})
+
+
+def _analytics_key_ok():
+    """Admin endpoints are open only while ANALYTICS_KEY is unset."""
+    if not ANALYTICS_KEY:
+        return True
+    provided = request.headers.get("X-Analytics-Key") or request.args.get("key", "")
+    return provided == ANALYTICS_KEY
 
 
 @main_bp.get("/api/analytics")
 def api_analytics():
     ip = request.remote_addr or "unknown"
-    if not check_rate_limit(f"analytics_{ip}", max_requests=5):
+    if not check_rate_limit("analytics", ip):
         return jsonify({"error": "rate limit exceeded"}), 429
 
-    if ANALYTICS_KEY:
-        provided = request.headers.get("X-Analytics-Key") or request.args.get("key", "")
-        if provided != ANALYTICS_KEY:
-            return jsonify({"error": "unauthorized"}), 401
+    if not _analytics_key_ok():
+        return jsonify({"error": "unauthorized"}), 401
+
+    days = request.args.get("days", 30, type=int)
+    if days not in DASHBOARD_DAYS:
+        return jsonify({"error": f"days must be one of {', '.join(map(str, DASHBOARD_DAYS))}"}), 400
 
     try:
-        return jsonify(get_analytics())
+        return jsonify(get_analytics_snapshot(days))
+    except redis_client.UNAVAILABLE_ERRORS as e:
+        return redis_unavailable(e)
     except Exception as e:
         current_app.logger.error(f"Analytics query error: {e}")
         return jsonify({"error": "server error"}), 500
 
 
+@main_bp.get("/api/analytics/timeseries")
+def api_analytics_timeseries():
+    """Event counts per hour (ranges up to 48h) or per day: ?since=&until= (ISO 8601, default last 24h)."""
+    ip = request.remote_addr or "unknown"
+    if not check_rate_limit("timeseries", ip):
+        return jsonify({"error": "rate limit exceeded"}), 429
+
+    if not _analytics_key_ok():
+        return jsonify({"error": "unauthorized"}), 401
+
+    try:
+        until = _parse_time(request.args.get("until")) or datetime.now(timezone.utc)
+        since = _parse_time(request.args.get("since")) or until - timedelta(hours=24)
+        if not since < until or until - since > TIMESERIES_MAX_RANGE:
+            raise ValueError("since must be before until, at most two years apart")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return jsonify(get_timeseries(since, until))
+    except redis_client.UNAVAILABLE_ERRORS as e:
+        return redis_unavailable(e)
+
+
+@main_bp.get("/api/analytics/export")
+def api_analytics_export():
+    """Raw events as streamed NDJSON: ?since=&until= (ISO 8601), ?types=a,b, ?cursor=, ?limit=."""
+    ip = request.remote_addr or "unknown"
+    if not check_rate_limit("export", ip):
+        return jsonify({"error": "rate limit exceeded"}), 429
+
+    # Never open: unlike the dashboard, this hands out session ids
+    if not ANALYTICS_KEY:
+        return jsonify({"error": "export requires ANALYTICS_KEY"}), 403
+    if not _analytics_key_ok():
+        return jsonify({"error": "unauthorized"}), 401
+
+    try:
+        since = _parse_time(request.args.get("since"))
+        until = _parse_time(request.args.get("until"))
+        types = [t for t in request.args.get("types", "").split(",") if t] or sorted(VALID_EVENT_TYPES)
+        if set(types) - VALID_EVENT_TYPES:
+            raise ValueError("invalid types")
+        cursor = parse_export_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = int(request.args.get("limit", EXPORT_MAX_EVENTS))
+        if not 1 <= limit <= EXPORT_MAX_EVENTS:
+            raise ValueError(f"limit must be 1..{EXPORT_MAX_EVENTS}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    lines = export_events(types, since, until, cursor, limit)
+    try:
+        first = next(lines, "")  # surface Redis errors while we can still send a status
+    except redis_client.UNAVAILABLE_ERRORS as e:
+        return redis_unavailable(e)
+
+    def body():
+        yield first
+        yield from lines
+
+    return Response(body(), mimetype="application/x-ndjson", headers={"Cache-Control": "no-store"})
+
+
+def _parse_time(value):
+    """ISO 8601 -> aware UTC datetime (naive means UTC); None if not given."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        raise ValueError(f"invalid time: {value}") from None
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@main_bp.get("/api/metrics")
+def api_metrics():
+    """Per-worker cache and buffer counters, for checking the caches do their job."""
+    ip = request.remote_addr or "unknown"
+    if not check_rate_limit("metrics", ip):
+        return jsonify({"error": "rate limit exceeded"}), 429
+
+    if not _analytics_key_ok():
+        return jsonify({"error": "unauthorized"}), 401
+
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "leaderboard_cache": cache_stats(),
+            "leaderboard_fallback": fallback_stats(),
+            "analytics_queue": queue_stats(),
+            "rate_limit": limiter.stats(),
+            "redis": redis_client.stats(),
+        }
+    )
+
+
 # --- React SPA Fallback ---
 @main_bp.route("/", defaults={"path": ""})
 @main_bp.route("/<path:path>")
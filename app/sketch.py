@@ -0,0 +1,72 @@
+"""Mergeable score-distribution summaries stored as flat Redis hash fields.
+
+A day's summary is a dict of counters:
+
+- "q:<i>": a log-bucketed quantile sketch (DDSketch style). Bucket i holds values in
+  (gamma**(i-1), gamma**i], so any quantile is reported within ACCURACY relative error
+  and the number of buckets grows only with log(max/min), not with the event count.
+- "h:<lo>": a fixed-width histogram for display, bins of HIST_WIDTH points.
+- "n" / "sum": count and total, for the mean.
+
+All fields are plain counts, so summaries for several days merge by addition.
+"""
+
+import math
+
+ACCURACY = 0.01  # relative error of reported quantiles
+HIST_WIDTH = 5  # points per histogram bin
+
+_GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_ZERO = "q:z"  # scores of 0 (log buckets only cover positive values)
+
+
+def fields_for(value: float) -> list:
+    """The counter fields one observation increments (besides "n" and "sum")."""
+    if value <= 0:
+        quantile_field = _ZERO
+    else:
+        quantile_field = f"q:{math.ceil(math.log(value) / _LOG_GAMMA)}"
+    return [quantile_field, f"h:{int(value // HIST_WIDTH) * HIST_WIDTH}"]
+
+
+def merge(summaries) -> dict:
+    """Sum several raw summaries (e.g. HGETALL replies for a range of days)."""
+    total = {}
+    for summary in summaries:
+        for name, count in summary.items():
+            total[name] = total.get(name, 0) + float(count)
+    return total
+
+
+def _bucket_value(name: str) -> float:
+    if name == _ZERO:
+        return 0.0
+    i = int(name[2:])
+    return 2 * _GAMMA**i / (_GAMMA + 1)  # midpoint in relative terms
+
+
+def quantile(summary: dict, q: float):
+    """Approximate q-quantile (0..1) of a merged summary, or None if it is empty."""
+    buckets = sorted((_bucket_value(name), count) for name, count in summary.items() if name.startswith("q:"))
+    n = sum(count for _, count in buckets)
+    if not n:
+        return None
+    rank = q * (n - 1)
+    seen = 0
+    for value, count in buckets:
+        seen += count
+        if seen > rank:
+            return value
+    return buckets[-1][0]
+
+
+def describe(summary: dict) -> dict:
+    """Count, mean, p50/p90/p99 and the histogram as [[bin_start, count], ...]."""
+    n = int(summary.get("n", 0))
+    result = {"count": n, "avg": round(summary.get("sum", 0) / n, 2) if n else 0}
+    for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        value = quantile(summary, q)
+        result[label] = round(value, 2) if value is not None else None
+    result["histogram"] = sorted([int(name[2:]), int(count)] for name, count in summary.items() if name.startswith("h:"))
+    return result
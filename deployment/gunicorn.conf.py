@@ -49,3 +49,10 @@ def when_ready(server):
 
 def on_exit(server):
     server.log.info("Shutting down TAKK application")
+
+
+def worker_exit(server, worker):
+    # Write analytics events still queued in this worker before it goes away
+    from app.analytics import flush_queue
+
+    flush_queue()
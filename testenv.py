@@ -26,6 +26,12 @@ os.environ["SANDBOX_MODE"] = "true"
 # --- Redis: point to local instance (tests use fakeredis fixture to avoid real connections) ---
 os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
 
+# --- Analytics: write /api/track events synchronously so tests can read them back ---
+os.environ.setdefault("ANALYTICS_ASYNC", "false")
+
+# --- Rate limiting: in-process buckets, no Redis needed ---
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
 # --- Temporary isolated dirs for media/catalog ---
 TMP_DIR = BASE_DIR / "tests" / "_tmp"
 TMP_DIR.mkdir(parents=True, exist_ok=True)
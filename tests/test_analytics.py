@@ -48,13 +48,12 @@ def test_track_event_stores_in_redis(fake_redis):
     from app.analytics import track_event
 
     track_event("session-abc", "page_view", {"page": "home"})
-    raw = fake_redis.lrange("events:page_view", 0, -1)
-    assert len(raw) == 1
-    event = json.loads(raw[0])
-    assert event["session_id"] == "session-abc"
-    assert event["event_type"] == "page_view"
-    assert event["data"] == {"page": "home"}
-    assert "timestamp" in event
+    entries = fake_redis.xrange("events:stream:page_view")
+    assert len(entries) == 1
+    entry_id, fields = entries[0]
+    assert fields["session_id"] == "session-abc"
+    assert json.loads(fields["data"]) == {"page": "home"}
+    assert not fake_redis.exists("events:page_view")  # no more unbounded lists
 
 
 def test_track_event_adds_session(fake_redis):
@@ -64,7 +63,10 @@ def test_track_event_adds_session(fake_redis):
     track_event("session-2", "page_view", {})
     track_event("session-1", "sign_completed", {"sign_id": "hej", "mode": "training"})
 
-    assert fake_redis.scard("analytics:sessions") == 2
+    assert fake_redis.pfcount("analytics:sessions:hll") == 2
+    assert fake_redis.pfcount("analytics:sessions:hll:type:page_view") == 2
+    assert fake_redis.pfcount("analytics:sessions:hll:type:sign_completed") == 1
+    assert not fake_redis.exists("analytics:sessions")  # the unbounded set is gone
 
 
 def test_track_event_increments_daily_counter(fake_redis):
@@ -83,13 +85,44 @@ def test_track_event_increments_daily_counter(fake_redis):
     assert int(count) == 2
 
 
-def test_track_event_sets_ttl(fake_redis):
+def test_track_event_trims_stream_by_age(fake_redis, monkeypatch):
+    import time
+
     from app.analytics import EVENT_TTL, track_event
 
+    calls = []
+    real_pipeline = fake_redis.pipeline
+
+    def spying_pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+        real_xadd = pipe.xadd
+        pipe.xadd = lambda name, fields, **kw: calls.append((name, kw)) or real_xadd(name, fields, **kw)
+        return pipe
+
+    monkeypatch.setattr(fake_redis, "pipeline", spying_pipeline)
     track_event("s1", "page_view", {})
-    ttl = fake_redis.ttl("events:page_view")
-    # TTL should be set and roughly equal to EVENT_TTL (within 5 seconds)
-    assert EVENT_TTL - 5 <= ttl <= EVENT_TTL
+
+    # fakeredis does not apply MINID, so check what would be sent to Redis
+    ((name, kw),) = calls
+    assert name == "events:stream:page_view"
+    assert kw["approximate"] is True
+    assert abs(int(kw["minid"]) - (time.time() - EVENT_TTL) * 1000) < 5000
+
+
+def test_iter_events_by_time_range(fake_redis):
+    from datetime import datetime, timezone
+
+    from app.analytics import iter_events
+
+    for hour in (8, 10, 12):
+        ms = int(datetime(2026, 3, 18, hour, tzinfo=timezone.utc).timestamp() * 1000)
+        fake_redis.xadd("events:stream:page_view", {"session_id": f"s{hour}", "data": "{}"}, id=f"{ms}-0")
+
+    since = datetime(2026, 3, 18, 9, tzinfo=timezone.utc)
+    until = datetime(2026, 3, 18, 12, tzinfo=timezone.utc)
+    events = list(iter_events("page_view", since, until, chunk=1))
+    assert [e["session_id"] for e in events] == ["s10", "s12"]
+    assert events[0]["timestamp"] == "2026-03-18T10:00:00+00:00"
 
 
 # --- get_analytics() ---
@@ -119,6 +152,66 @@ def test_get_analytics_unique_sessions():
     assert result["unique_sessions"] == 2
 
 
+def test_get_analytics_unique_sessions_by_day_and_window():
+    from datetime import datetime, timezone
+    from unittest.mock import patch
+
+    from app.analytics import get_analytics, track_event
+
+    today = datetime(2026, 3, 18, 12, 0, 0, tzinfo=timezone.utc)
+    with patch("app.analytics.datetime") as mock_dt:
+        mock_dt.now.return_value = datetime(2026, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+        track_event("old", "page_view", {})
+        mock_dt.now.return_value = datetime(2026, 3, 17, 12, 0, 0, tzinfo=timezone.utc)
+        track_event("s1", "page_view", {})
+        mock_dt.now.return_value = today
+        track_event("s1", "page_view", {})
+        track_event("s2", "quiz_attempt", {"level": 1})
+        result = get_analytics()
+
+    assert result["unique_sessions_daily"] == {"2026-03-18": 2, "2026-03-17": 1, "2026-03-01": 1}
+    assert result["unique_sessions_7d"] == 2
+    assert result["unique_sessions_30d"] == 3
+    assert result["unique_sessions_by_type"]["quiz_attempt"] == 1
+
+
+def test_migrate_sessions_imports_legacy_set(fake_redis):
+    import json
+
+    from app.analytics import get_analytics, migrate_sessions
+
+    fake_redis.sadd("analytics:sessions", "a", "b", "c")
+    fake_redis.xadd("events:stream:page_view", {"session_id": "a", "data": json.dumps({})}, id="1773828000000-0")  # 2026-03-18T10:00Z
+
+    assert migrate_sessions(delete_legacy=True) == {"sessions": 3, "events": 1}
+    assert get_analytics()["unique_sessions"] == 3
+    assert fake_redis.pfcount("analytics:sessions:hll:2026-03-18") == 1
+    assert not fake_redis.exists("analytics:sessions")
+
+
+def test_get_analytics_day_range_in_one_round_trip(fake_redis, monkeypatch):
+    from datetime import datetime, timezone
+    from unittest.mock import patch
+
+    from app.analytics import get_analytics, track_event
+
+    with patch("app.analytics.datetime") as mock_dt:
+        for day in (1, 10, 17):
+            mock_dt.now.return_value = datetime(2026, 3, day, 12, 0, 0, tzinfo=timezone.utc)
+            track_event("s1", "page_view", {})
+
+        calls = []
+        real_pipeline = fake_redis.pipeline
+        monkeypatch.setattr(fake_redis, "pipeline", lambda *a, **kw: calls.append(1) or real_pipeline(*a, **kw))
+        monkeypatch.setattr(fake_redis, "execute_command", None)  # any direct command would fail
+        result = get_analytics(days=7)
+
+    assert len(calls) == 1
+    assert result["days"] == 7
+    assert list(result["daily"]) == ["2026-03-17"]
+    assert result["unique_sessions_30d"] == 1
+
+
 def test_get_analytics_event_counts():
     from app.analytics import get_analytics, track_event
 
@@ -168,36 +261,382 @@ def test_get_analytics_comp_stats():
     assert result["comp_avg_score"] == 4.0
 
 
-def test_get_analytics_quiz_count():
+def test_get_analytics_reads_aggregates_not_lists(fake_redis):
     from app.analytics import get_analytics, track_event
 
-    track_event("s1", "quiz_attempt", {"level": 1, "total": 5})
-    track_event("s2", "quiz_attempt", {"level": 2, "total": 7})
+    track_event("s1", "sign_completed", {"sign_id": "hej", "mode": "training"})
+    track_event("s1", "competition_attempt", {"score": 2, "total": 10})
+    fake_redis.delete("events:stream:sign_completed", "events:stream:competition_attempt")
 
     result = get_analytics()
-    assert result["quiz_count"] == 2
+    assert result["top_signs"] == [("hej", 1)]
+    assert result["comp_count"] == 1
+
+
+def test_backfill_aggregates_from_streams(fake_redis):
+    import json
 
+    from app.analytics import backfill_aggregates, get_analytics
 
-def test_get_analytics_recent_sorted():
+    def add(event_type, data):
+        fake_redis.xadd(f"events:stream:{event_type}", {"session_id": "s", "data": json.dumps(data)})
+
+    for sign in ("hej", "hej", "tack"):
+        add("sign_completed", {"sign_id": sign})
+    add("level_started", {"level": 3})
+    add("competition_attempt", {"score": 3})
+    add("competition_attempt", {"score": 5})
+    add("competition_attempt", {"score": "n/a"})
+    add("competition_attempt", {"score": "inf"})
+
+    assert backfill_aggregates() == {"signs": 3, "levels": 1, "competitions": 2}
+    # Re-running replaces rather than doubles
+    backfill_aggregates()
+
+    result = get_analytics()
+    assert result["top_signs"] == [("hej", 2), ("tack", 1)]
+    assert result["top_levels"] == [("3", 1)]
+    assert result["comp_count"] == 2 and result["comp_avg_score"] == 4.0
+
+
+def test_get_analytics_score_distribution_over_days():
     from datetime import datetime, timezone
     from unittest.mock import patch
 
     from app.analytics import get_analytics, track_event
 
-    t1 = datetime(2026, 3, 18, 10, 0, 0, tzinfo=timezone.utc)
-    t2 = datetime(2026, 3, 18, 11, 0, 0, tzinfo=timezone.utc)
-
     with patch("app.analytics.datetime") as mock_dt:
-        mock_dt.now.return_value = t1
-        track_event("s1", "page_view", {"page": "home"})
-        mock_dt.now.return_value = t2
-        track_event("s1", "sign_completed", {"sign_id": "hej", "mode": "training"})
+        mock_dt.now.return_value = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+        track_event("s1", "competition_attempt", {"score": 100})
+        mock_dt.now.return_value = datetime(2026, 3, 18, 12, tzinfo=timezone.utc)
+        for score in (10, 20, 30):
+            track_event("s1", "competition_attempt", {"score": score, "total": 10})
+        week = get_analytics(days=7)["comp_scores"]
+        month = get_analytics(days=30)["comp_scores"]
+
+    assert week["count"] == 3 and week["avg"] == 20.0
+    assert abs(week["p50"] - 20) <= 0.2
+    assert week["histogram"] == [[10, 1], [20, 1], [30, 1]]
+    assert month["count"] == 4 and month["histogram"][-1] == [100, 1]
+
+
+def test_get_analytics_quiz_count():
+    from app.analytics import get_analytics, track_event
+
+    track_event("s1", "quiz_attempt", {"level": 1, "total": 5})
+    track_event("s2", "quiz_attempt", {"level": 2, "total": 7})
+
+    result = get_analytics()
+    assert result["quiz_count"] == 2
+
+
+def test_get_analytics_recent_sorted(fake_redis):
+    import json
+
+    from app.analytics import get_analytics
+
+    # Stream IDs are the receive time in ms
+    fake_redis.xadd("events:stream:page_view", {"session_id": "s1", "data": json.dumps({"page": "home"})}, id="1773828000000-0")
+    fake_redis.xadd("events:stream:sign_completed", {"session_id": "s1", "data": json.dumps({"sign_id": "hej"})}, id="1773831600000-0")
 
     result = get_analytics()
     recent = result["recent"]
     assert len(recent) == 2
     # Most recent first
-    assert recent[0]["timestamp"] > recent[1]["timestamp"]
+    assert recent[0]["event_type"] == "sign_completed"
+    assert recent[0]["timestamp"] == "2026-03-18T11:00:00+00:00"
+    assert recent[1]["data"] == {"page": "home"}
+
+
+def test_migrate_event_lists_keeps_order_and_live_entries(fake_redis):
+    import json
+
+    from app.analytics import get_analytics, migrate_event_lists
+
+    fake_redis.xadd("events:stream:page_view", {"session_id": "live", "data": "{}"})
+    for ts, sid in (("2026-03-18T11:00:00+00:00", "b"), ("2026-03-18T10:00:00+00:00", "a"), ("2026-03-18T10:00:00+00:00", "a2")):
+        fake_redis.rpush("events:page_view", json.dumps({"session_id": sid, "timestamp": ts, "event_type": "page_view", "data": {}}))
+
+    assert migrate_event_lists()["page_view"] == 3
+    assert [f["session_id"] for _, f in fake_redis.xrange("events:stream:page_view")] == ["a", "a2", "b", "live"]
+    assert not fake_redis.exists("events:page_view")
+    assert get_analytics()["events"]["page_view"] == 4
+
+
+# --- hourly/daily rollups ---
+
+
+def test_track_event_hourly_and_daily_counters_expire(fake_redis):
+    from datetime import datetime, timezone
+    from unittest.mock import patch
+
+    from app.analytics import DAILY_TTL, HOURLY_TTL, track_event
+
+    with patch("app.analytics.datetime") as mock_dt:
+        mock_dt.now.return_value = datetime(2026, 3, 18, 9, 30, tzinfo=timezone.utc)
+        track_event("s1", "page_view", {})
+
+    assert fake_redis.hget("analytics:hourly:2026-03-18T09", "page_view") == "1"
+    assert HOURLY_TTL - 5 <= fake_redis.ttl("analytics:hourly:2026-03-18T09") <= HOURLY_TTL
+    assert DAILY_TTL - 5 <= fake_redis.ttl("analytics:daily:2026-03-18") <= DAILY_TTL
+
+
+def test_get_timeseries_picks_resolution(fake_redis):
+    from datetime import datetime, timedelta, timezone
+
+    from app.analytics import get_timeseries, track_event
+
+    track_event("s1", "page_view", {})
+    now = datetime.now(timezone.utc)
+
+    hourly = get_timeseries(now - timedelta(hours=5), now)
+    assert hourly["resolution"] == "hour"
+    assert len(hourly["points"]) == 6
+    assert hourly["points"][-1][1] == {"page_view": 1}
+
+    daily = get_timeseries(now - timedelta(days=10), now)
+    assert daily["resolution"] == "day"
+    assert len(daily["points"]) == 11
+    assert daily["points"][-1] == [now.strftime("%Y-%m-%d"), {"page_view": 1}]
+
+
+def test_get_timeseries_normalises_offsets_to_utc(fake_redis):
+    from datetime import datetime, timedelta, timezone
+
+    from app.analytics import get_timeseries
+
+    hour = (datetime.now(timezone.utc) - timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+    fake_redis.hset(f"analytics:hourly:{hour:%Y-%m-%dT%H}", mapping={"page_view": 7})
+    cest = timezone(timedelta(hours=2))
+
+    series = get_timeseries(hour.astimezone(cest), (hour + timedelta(minutes=59)).astimezone(cest))
+    assert series["points"] == [[f"{hour:%Y-%m-%dT%H}", {"page_view": 7}]]
+
+
+def test_compact_rolls_up_and_sets_expiry(fake_redis):
+    from datetime import datetime, timezone
+
+    from app.analytics import compact
+
+    now = datetime(2026, 3, 18, 12, tzinfo=timezone.utc)
+    fake_redis.hset("analytics:hourly:2026-03-17T08", mapping={"page_view": 2})
+    fake_redis.hset("analytics:hourly:2026-03-17T20", mapping={"page_view": 1, "quiz_attempt": 4})
+    fake_redis.hset("analytics:daily:2026-03-10", mapping={"page_view": 9})  # legacy, no TTL
+
+    result = compact(now)
+    assert result["rolled_up"] == 1 and result["expiry_set"] == 1
+    assert fake_redis.hgetall("analytics:daily:2026-03-17") == {"page_view": "3", "quiz_attempt": "4"}
+    assert fake_redis.ttl("analytics:daily:2026-03-10") > 0
+    assert fake_redis.hgetall("analytics:daily:2026-03-10") == {"page_view": "9"}  # existing days untouched
+
+    assert compact(now)["rolled_up"] == 0
+
+
+def test_compact_trims_every_stream(fake_redis, monkeypatch):
+    from datetime import datetime, timezone
+
+    from app.analytics import EVENT_TTL, VALID_EVENT_TYPES, compact
+
+    calls = []
+    monkeypatch.setattr(fake_redis, "xtrim", lambda name, **kw: calls.append((name, kw)) or 0)
+    now = datetime(2026, 3, 18, 12, tzinfo=timezone.utc)
+    compact(now)
+
+    # fakeredis does not apply MINID, so check what would be sent to Redis
+    assert {name for name, _ in calls} == {f"events:stream:{t}" for t in VALID_EVENT_TYPES}
+    assert all(int(kw["minid"]) == int((now.timestamp() - EVENT_TTL) * 1000) for _, kw in calls)
+
+
+def test_api_timeseries(client, analytics_key):
+    res = client.get("/api/analytics/timeseries?key=testkey&since=2026-03-01&until=2026-03-03")
+    assert res.status_code == 200
+    assert res.get_json()["resolution"] == "day"
+    assert client.get("/api/analytics/timeseries?key=testkey&since=2026-03-03&until=2026-03-01").status_code == 400
+
+
+def test_api_timeseries_offset_times(client, analytics_key, fake_redis):
+    fake_redis.hset("analytics:daily:2026-02-28", mapping={"page_view": 1})
+    fake_redis.hset("analytics:daily:2026-03-01", mapping={"page_view": 2})
+
+    # 01:00+02:00 on March 1st is still February 28th in UTC
+    res = client.get("/api/analytics/timeseries?key=testkey&since=2026-03-01T01:00:00%2B02:00&until=2026-03-01T12:00:00%2B02:00")
+    assert res.get_json()["points"] == [["2026-02-28", {"page_view": 1}], ["2026-03-01", {"page_view": 2}]]
+
+
+# --- get_analytics_snapshot() ---
+
+
+@pytest.fixture()
+def counted_analytics(monkeypatch):
+    import app.analytics as an
+
+    calls = []
+    real = an.get_analytics
+    monkeypatch.setattr(an, "get_analytics", lambda days=30: calls.append(days) or real(days))
+    return calls
+
+
+def test_snapshot_computed_once_while_fresh(counted_analytics):
+    from app.analytics import get_analytics_snapshot, track_event
+
+    track_event("s1", "page_view", {})
+    first = get_analytics_snapshot(7)
+    second = get_analytics_snapshot(7)
+    assert counted_analytics == [7]
+    assert second["generated_at"] == first["generated_at"] and second["stale"] is False
+    assert second["events"]["page_view"] == 1
+
+
+def test_snapshot_refreshed_when_too_old(fake_redis, counted_analytics, monkeypatch):
+    import app.analytics as an
+
+    get = an.get_analytics_snapshot
+    get(30)
+    monkeypatch.setattr(an, "SNAPSHOT_MAX_AGE", -1)
+    get(30)
+    assert counted_analytics == [30, 30]
+    assert not fake_redis.exists("analytics:snapshot:30:lock")  # released after refresh
+
+
+def test_snapshot_served_stale_while_another_worker_refreshes(fake_redis, counted_analytics, monkeypatch):
+    import app.analytics as an
+
+    an.get_analytics_snapshot(30)
+    monkeypatch.setattr(an, "SNAPSHOT_MAX_AGE", -1)
+    fake_redis.set("analytics:snapshot:30:lock", "other-worker")
+
+    result = an.get_analytics_snapshot(30)
+    assert result["stale"] is True
+    assert counted_analytics == [30]
+    assert fake_redis.get("analytics:snapshot:30:lock") == "other-worker"
+
+
+# --- write-behind queue ---
+
+
+def _stamp(event_type, data=None):
+    from datetime import datetime, timezone
+
+    return ("s1", event_type, data or {}, datetime.now(timezone.utc))
+
+
+def test_score_aggregates_skip_out_of_range_scores(fake_redis):
+    from app.analytics import get_analytics, track_events
+
+    scores = [4, "NaN", "inf", 1e308, 1e308, -1, 100001]
+    assert all(track_events([("s1", "competition_attempt", {"score": score}) for score in scores]))
+
+    assert fake_redis.xlen("events:stream:competition_attempt") == len(scores)  # raw events are kept
+    result = get_analytics()
+    assert result["comp_count"] == 1 and result["comp_avg_score"] == 4.0
+    assert result["comp_scores"]["count"] == 1
+
+
+def test_events_keep_receive_time_when_written_late(fake_redis):
+    from datetime import datetime, timedelta, timezone
+
+    from app.analytics import EventWriter, get_analytics, iter_events
+
+    received = datetime.now(timezone.utc) - timedelta(hours=3)  # e.g. requeued through an outage
+    w = EventWriter(maxsize=100, batch=100, interval=60)
+    w._queue.append(("s1", "page_view", {"page": "home"}, received))
+    w.flush()
+
+    (event,) = iter_events("page_view", received - timedelta(minutes=1), received + timedelta(minutes=1))
+    assert event["timestamp"] == received.isoformat(timespec="seconds")
+    assert list(iter_events("page_view", since=received + timedelta(minutes=1))) == []
+    assert get_analytics()["recent"][0]["timestamp"] == event["timestamp"]
+
+
+def test_event_writer_batches_and_flushes(fake_redis):
+    from app.analytics import EventWriter
+
+    w = EventWriter(maxsize=100, batch=3, interval=60)
+    w.put([_stamp("page_view"), _stamp("page_view")])
+    assert fake_redis.xlen("events:stream:page_view") == 0
+
+    w.put([_stamp("sign_completed", {"sign_id": "hej"})])  # reaches batch size -> thread flushes
+    w.shutdown(timeout=2)
+    assert fake_redis.xlen("events:stream:page_view") == 2
+    assert fake_redis.zscore("analytics:top_signs", "hej") == 1
+    assert w.stats()["flushed"] == 3 and w.stats()["pending"] == 0
+
+
+def test_event_writer_drop_policies():
+    from app.analytics import EventWriter
+
+    newest = EventWriter(maxsize=2, batch=100, interval=60)
+    assert newest.put([_stamp("page_view", {"n": i}) for i in range(3)]) == [True, True, False]
+    assert [item[2]["n"] for item in newest._queue] == [0, 1]
+
+    oldest = EventWriter(maxsize=2, batch=100, interval=60, policy="drop_oldest")
+    assert oldest.put([_stamp("page_view", {"n": i}) for i in range(3)]) == [True, True, True]
+    assert [item[2]["n"] for item in oldest._queue] == [1, 2]
+    assert newest.stats()["dropped"] == oldest.stats()["dropped"] == 1
+
+
+def test_event_writer_requeues_when_redis_down(fake_redis, monkeypatch):
+    import redis
+
+    import app.analytics as an
+
+    w = an.EventWriter(maxsize=100, batch=100, interval=60)
+    w._queue.extend([_stamp("page_view"), _stamp("page_view")])
+
+    def down():
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(an, "_get_client", down)
+    assert w.flush() is False
+    assert w.stats()["pending"] == 2 and w.stats()["failed_flushes"] == 1
+
+    monkeypatch.setattr(an, "_get_client", lambda: fake_redis)
+    assert w.flush() is True
+    assert fake_redis.xlen("events:stream:page_view") == 2
+
+
+def test_event_writer_skips_rejected_event_without_replaying_batch(fake_redis):
+    from app.analytics import EventWriter
+
+    fake_redis.set("analytics:top_signs", "not a sorted set")  # ZINCRBY fails with WRONGTYPE
+    w = EventWriter(maxsize=100, batch=100, interval=60)
+    w._queue.extend([_stamp("page_view"), _stamp("sign_completed", {"sign_id": "hej"}), _stamp("page_view")])
+
+    for _ in range(3):
+        assert w.flush() is True
+    assert fake_redis.xlen("events:stream:page_view") == 2
+    assert fake_redis.xlen("events:stream:sign_completed") == 1  # written once, not replayed
+    daily = fake_redis.hgetall(f"analytics:daily:{_stamp('page_view')[3]:%Y-%m-%d}")
+    assert daily == {"page_view": "2", "sign_completed": "1"}
+    assert w.stats()["pending"] == 0
+    assert w.stats()["flushed"] == 2 and w.stats()["skipped"] == 1
+
+
+def test_event_writer_skips_event_that_cannot_be_queued(fake_redis):
+    from app.analytics import EventWriter
+
+    w = EventWriter(maxsize=100, batch=100, interval=60)
+    w._queue.extend([_stamp("page_view"), _stamp("page_view", {"bad": {1, 2}}), _stamp("page_view")])  # a set is not JSON
+
+    assert w.flush() is True
+    assert fake_redis.xlen("events:stream:page_view") == 2
+    assert w.stats()["pending"] == 0 and w.stats()["skipped"] == 1
+
+
+def test_api_track_async_enqueues(client, fake_redis, monkeypatch):
+    import app.analytics as an
+
+    w = an.EventWriter(maxsize=1, batch=100, interval=60)
+    monkeypatch.setattr(an, "ASYNC_WRITES", True)
+    monkeypatch.setattr(an, "writer", w)
+
+    body = {"session_id": "abc", "event_type": "page_view", "data": {}}
+    assert client.post("/api/track", json=body).status_code == 200
+    assert fake_redis.xlen("events:stream:page_view") == 0  # not written on the request path
+    assert client.post("/api/track", json=body).status_code == 503  # queue full
+
+    w.shutdown(timeout=2)
+    assert fake_redis.xlen("events:stream:page_view") == 1
 
 
 # --- API routes ---
@@ -245,6 +684,84 @@ def test_api_track_session_id_too_long(client):
     assert res.status_code == 400
 
 
+def test_track_events_one_pipeline_per_batch(fake_redis):
+    from app.analytics import track_events
+
+    results = track_events(
+        [
+            ("s1", "page_view", {"page": "home"}),
+            ("s1", "bogus", {}),
+            ("s1", "sign_completed", {"sign_id": "hej"}),
+        ]
+    )
+    assert results == [True, False, True]
+    assert fake_redis.xlen("events:stream:page_view") == 1
+    assert fake_redis.xlen("events:stream:sign_completed") == 1
+
+
+def test_api_track_batch_per_event_results(client, fake_redis):
+    res = client.post(
+        "/api/track",
+        json={
+            "session_id": "abc",
+            "events": [
+                {"event_type": "page_view", "data": {"page": "home"}},
+                {"event_type": "made_up_event", "data": {}},
+                {"event_type": "sign_viewed", "data": "nope"},
+                {"event_type": "sign_viewed", "data": {"sign_id": "hej"}},
+            ],
+        },
+    )
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["accepted"] == 2
+    assert [r["ok"] for r in body["results"]] == [True, False, False, True]
+    assert body["results"][1]["error"] == "invalid event_type"
+    assert fake_redis.xlen("events:stream:sign_viewed") == 1
+
+
+def test_api_track_batch_accepts_beacon_body(client, fake_redis):
+    import json
+
+    payload = {"session_id": "abc", "events": [{"event_type": "page_view", "data": {}}]}
+    res = client.post("/api/track", data=json.dumps(payload), content_type="text/plain;charset=UTF-8")
+    assert res.status_code == 200
+    assert fake_redis.xlen("events:stream:page_view") == 1
+
+
+def test_api_track_rejects_non_finite_score(client, fake_redis):
+    body = '{"session_id": "abc", "event_type": "competition_attempt", "data": {"score": %s}}'
+    for value in ("1e999", "Infinity", "NaN"):
+        res = client.post("/api/track", data=body % value, content_type="application/json")
+        assert res.status_code == 400
+        assert res.get_json()["error"] == "score must be a finite number"
+
+    batch = '{"session_id": "abc", "events": [{"event_type": "competition_attempt", "data": {"score": 1e999}}, {"event_type": "page_view"}]}'
+    res = client.post("/api/track", data=batch, content_type="application/json")
+    assert [r["ok"] for r in res.get_json()["results"]] == [False, True]
+    assert fake_redis.xlen("events:stream:competition_attempt") == 0
+    assert fake_redis.hgetall("analytics:comp") == {}
+
+
+def test_api_track_batch_rejects_bad_envelope(client):
+    from app.routes import TRACK_BATCH_MAX_EVENTS
+
+    assert client.post("/api/track", json={"session_id": "abc", "events": []}).status_code == 400
+    assert client.post("/api/track", json={"events": [{"event_type": "page_view"}]}).status_code == 400
+    too_many = [{"event_type": "page_view"}] * (TRACK_BATCH_MAX_EVENTS + 1)
+    assert client.post("/api/track", json={"session_id": "abc", "events": too_many}).status_code == 400
+
+
+def test_api_analytics_days_param(client, analytics_key, monkeypatch):
+    import app.routes as rt
+    from app.ratelimit import RateLimiter, TokenBucketBackend
+
+    monkeypatch.setattr(rt, "limiter", RateLimiter(TokenBucketBackend()))
+    data = client.get("/api/analytics?key=testkey&days=90").get_json()
+    assert data["days"] == 90 and "generated_at" in data
+    assert client.get("/api/analytics?key=testkey&days=14").status_code == 400
+
+
 def test_api_analytics_no_key(client, analytics_key):
     res = client.get("/api/analytics")
     assert res.status_code == 401
@@ -268,3 +785,60 @@ def test_api_analytics_correct_key(client, analytics_key):
 def test_api_analytics_key_via_header(client, analytics_key):
     res = client.get("/api/analytics", headers={"X-Analytics-Key": analytics_key})
     assert res.status_code == 200
+
+
+# --- /api/analytics/export ---
+
+
+def _seed_export(fake_redis):
+    import json
+
+    for i, hour in enumerate((8, 10, 12)):
+        ms = 1773820800000 + hour * 3600_000 - 8 * 3600_000  # 2026-03-18T<hour>:00Z
+        fake_redis.xadd("events:stream:page_view", {"session_id": f"p{i}", "data": json.dumps({"page": "home"})}, id=f"{ms}-0")
+    fake_redis.xadd("events:stream:quiz_attempt", {"session_id": "q0", "data": json.dumps({"level": 1})}, id="1773828000000-0")
+
+
+def _ndjson(res):
+    import json
+
+    return [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+
+
+def test_api_export_requires_configured_key(client, monkeypatch):
+    import app.routes as rt
+
+    monkeypatch.setattr(rt, "ANALYTICS_KEY", "")
+    assert client.get("/api/analytics/export").status_code == 403
+
+
+def test_api_export_streams_ndjson_by_type_and_range(client, fake_redis, analytics_key):
+    _seed_export(fake_redis)
+
+    res = client.get("/api/analytics/export?key=testkey")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    lines = _ndjson(res)
+    assert [e["session_id"] for e in lines] == ["p0", "p1", "p2", "q0"]
+    assert lines[0]["data"] == {"page": "home"} and lines[0]["event_type"] == "page_view"
+
+    res = client.get("/api/analytics/export?key=testkey&types=page_view&since=2026-03-18T09:00:00Z&until=2026-03-18T11:00:00")
+    assert [e["session_id"] for e in _ndjson(res)] == ["p1"]
+
+
+def test_api_export_resumes_from_cursor(client, fake_redis, analytics_key):
+    _seed_export(fake_redis)
+
+    page = _ndjson(client.get("/api/analytics/export?key=testkey&limit=2"))
+    assert [e.get("session_id") for e in page[:2]] == ["p0", "p1"]
+    cursor = page[-1]["next_cursor"]
+    assert cursor == page[1]["cursor"]
+
+    rest = _ndjson(client.get(f"/api/analytics/export?key=testkey&cursor={cursor}"))
+    assert [e["session_id"] for e in rest] == ["p2", "q0"]
+    assert "next_cursor" not in rest[-1]
+
+
+def test_api_export_rejects_bad_params(client, analytics_key):
+    for query in ("types=bogus", "since=yesterday", "cursor=page_view:abc", "limit=0"):
+        assert client.get(f"/api/analytics/export?key=testkey&{query}").status_code == 400
@@ -109,7 +109,7 @@ def test_api_score_post_ok(client, monkeypatch):
     from app import routes
 
     def fake_add_score(name, score):
-        return ([{"name": name, "score": score}], True)
+        return ([{"name": name, "score": score}], True, {"rank": 1, "percentile": 0.0, "total": 1})
 
     monkeypatch.setattr(routes, "add_score", fake_add_score)
 
@@ -119,6 +119,7 @@ def test_api_score_post_ok(client, monkeypatch):
     assert data["ok"] is True
     assert data["madeTop"] is True
     assert data["scores"][0]["name"] == "HB"
+    assert data["rank"]["rank"] == 1
 
 
 def test_api_score_post_bad_request(client):
@@ -132,7 +133,7 @@ def test_api_scores(client, monkeypatch):
     monkeypatch.setattr(
         routes,
         "get_top",
-        lambda limit=10: [
+        lambda limit=10, window="all": [
             {"name": "Alice", "score": 5.20, "date": "2026-01-01T00:00:00+00:00"},
             {"name": "Bob", "score": 3.10, "date": "2026-01-02T00:00:00+00:00"},
         ],
@@ -147,13 +148,12 @@ def test_api_scores(client, monkeypatch):
 
 
 def test_analytics_rate_limit(client, monkeypatch):
-    from collections import defaultdict
-
     from app import routes  # noqa: F811
+    from app.ratelimit import RateLimiter, TokenBucketBackend
 
-    # Start with a clean rate limit store and no auth requirement
-    monkeypatch.setattr(routes, "rate_limit_store", defaultdict(list))
-    monkeypatch.setattr(routes, "get_analytics", lambda: {"events": []})
+    # Start with a clean rate limiter and no auth requirement
+    monkeypatch.setattr(routes, "limiter", RateLimiter(TokenBucketBackend()))
+    monkeypatch.setattr(routes, "get_analytics_snapshot", lambda days=30: {"events": []})
     monkeypatch.setattr(routes, "ANALYTICS_KEY", "")
 
     # First 5 requests should succeed
@@ -164,3 +164,94 @@ def test_analytics_rate_limit(client, monkeypatch):
     # 6th request should be rate limited
     r = client.get("/api/analytics")
     assert r.status_code == 429
+
+
+def test_api_metrics_requires_key(client, monkeypatch):
+    from app import routes
+
+    monkeypatch.setattr(routes, "ANALYTICS_KEY", "testkey")
+    assert client.get("/api/metrics").status_code == 401
+
+    r = client.get("/api/metrics", headers={"X-Analytics-Key": "testkey"})
+    assert r.status_code == 200
+    assert set(r.get_json()["leaderboard_cache"]) == {"hits", "misses", "size"}
+    assert {"keys", "evicted_idle", "evicted_lru"} <= set(r.get_json()["rate_limit"])
+
+
+# --- Media ---
+def monkey_media(monkeypatch, tmp_path, mode=""):
+    from app import routes
+
+    video = tmp_path / "media" / "signs" / "hej" / "hej_square.mp4"
+    video.parent.mkdir(parents=True)
+    video.write_bytes(bytes(range(256)) * 8)
+    monkeypatch.setattr(routes, "MEDIA_ROOT", (tmp_path / "media").resolve())
+    monkeypatch.setattr(routes, "MEDIA_SENDFILE", mode)
+    return video
+
+
+def test_media_serves_file_with_validators(client, monkeypatch, tmp_path):
+    video = monkey_media(monkeypatch, tmp_path)
+
+    r = client.get("/media/signs/hej/hej_square.mp4")
+    assert r.status_code == 200
+    assert r.mimetype == "video/mp4"
+    assert r.data == video.read_bytes()
+    assert r.headers["Accept-Ranges"] == "bytes"
+    assert r.headers["Last-Modified"]
+    assert "max-age=2592000" in r.headers["Cache-Control"]
+
+    r = client.get("/media/signs/hej/hej_square.mp4", headers={"If-None-Match": r.headers["ETag"]})
+    assert r.status_code == 304
+
+
+def test_media_answers_range_requests(client, monkeypatch, tmp_path):
+    video = monkey_media(monkeypatch, tmp_path)
+
+    r = client.get("/media/signs/hej/hej_square.mp4", headers={"Range": "bytes=1000-1099"})
+    assert r.status_code == 206
+    assert r.headers["Content-Range"] == "bytes 1000-1099/2048"
+    assert r.data == video.read_bytes()[1000:1100]
+
+
+def test_media_rejects_traversal_and_missing(client, monkeypatch, tmp_path):
+    monkey_media(monkeypatch, tmp_path)
+    (tmp_path / "secret.txt").write_text("x")
+
+    assert client.get("/media/../secret.txt").status_code in (403, 404)
+    assert client.get("/media/signs/%2e%2e/%2e%2e/%2e%2e/secret.txt").status_code in (403, 404)
+    assert client.get("/media/signs/nope.mp4").status_code == 404
+    assert client.get("/media/signs/hej").status_code == 404  # directory
+
+
+def test_media_hands_off_to_proxy(client, monkeypatch, tmp_path):
+    video = monkey_media(monkeypatch, tmp_path, mode="x-accel")
+
+    r = client.get("/media/signs/hej/hej_square.mp4")
+    assert r.status_code == 200
+    assert r.headers["X-Accel-Redirect"] == "/_media/signs/hej/hej_square.mp4"
+    assert r.mimetype == "video/mp4"
+    assert r.data == b""
+
+    from app import routes
+
+    monkeypatch.setattr(routes, "MEDIA_SENDFILE", "x-sendfile")
+    r = client.get("/media/signs/hej/hej_square.mp4")
+    assert r.headers["X-Sendfile"] == str(video.resolve())
+    assert r.data == b""
+
+
+def test_media_proxy_headers_survive_non_ascii_names(client, monkeypatch, tmp_path):
+    from app import routes
+
+    monkey_media(monkeypatch, tmp_path, mode="x-accel")
+    video = tmp_path / "media" / "signs" / "vänta" / "vänta_square.mp4"
+    video.parent.mkdir()
+    video.write_bytes(b"mp4")
+
+    r = client.get("/media/signs/vänta/vänta_square.mp4")
+    assert r.headers["X-Accel-Redirect"] == "/_media/signs/v%C3%A4nta/v%C3%A4nta_square.mp4"
+
+    monkeypatch.setattr(routes, "MEDIA_SENDFILE", "x-sendfile")
+    r = client.get("/media/signs/vänta/vänta_square.mp4")
+    assert r.headers["X-Sendfile"].encode("latin-1") == str(video.resolve()).encode("utf-8")
@@ -0,0 +1,203 @@
+import json
+import os
+
+import testenv  # noqa: F401
+
+MANIFEST = {
+    "version": 2,
+    "levels": [
+        {"id": 1, "name": "Nivå 1", "signs": ["hej", "tack"]},
+        {"id": 2, "name": "Nivå 2", "signs": ["tack", "bra"]},
+        {"id": 3, "name": "Nivå 3", "signs": ["hej", "sova"]},
+    ],
+    "signs": {
+        "hej": {"label": "Hej", "video": "/v/hej.mp4", "pictograms": ["/p/hej.jpg"]},
+        "tack": {"label": "tack", "video": "/v/tack.mp4", "symbol": "/p/tack.jpg"},
+        "bra": {"label": "Bra", "video": "/v/bra.mp4", "pictograms": ["/p/bra.jpg"]},
+    },
+}
+
+
+def test_build_index_level_lookup():
+    from app.catalog import build_index
+
+    idx = build_index(MANIFEST)
+    assert idx.level_by_id[2]["name"] == "Nivå 2"
+    assert [s["id"] for s in idx.level_signs[2]] == ["tack", "bra"]
+    # Unknown sign ids fall back to a bare label
+    assert idx.level_signs[3][1] == {"id": "sova", "label": "sova"}
+
+
+def test_build_index_cumulative_ordered_unique():
+    from app.catalog import build_index
+
+    idx = build_index(MANIFEST)
+    assert [s["id"] for s in idx.cumulative_signs(1)] == ["hej", "tack"]
+    assert [s["id"] for s in idx.cumulative_signs(3)] == ["hej", "tack", "bra", "sova"]
+    assert [s["id"] for s in idx.cumulative_signs(2)] == ["hej", "tack", "bra"]
+
+
+def test_build_index_cumulative_follows_level_ids_not_file_order():
+    from app.catalog import build_index
+
+    shuffled = dict(MANIFEST, levels=list(reversed(MANIFEST["levels"])))
+    idx = build_index(shuffled)
+    assert [s["id"] for s in idx.cumulative_signs(2)] == ["hej", "tack", "bra"]
+    # Level 1 is a prefix of level 2, which is a prefix of level 3
+    assert idx.cumulative_signs(2) == idx.cumulative_signs(3)[:3]
+
+
+def test_build_index_signs_sorted_with_symbol_fallback():
+    from app.catalog import build_index
+
+    idx = build_index(MANIFEST)
+    assert [s["id"] for s in idx.signs] == ["bra", "hej", "tack"]
+    assert idx.signs[2]["pictograms"] == ["/p/tack.jpg"]
+
+
+def test_manifest_parsed_once_until_file_changes(write_json, monkeypatch):
+    import app.catalog as cat
+
+    path = write_json("catalog/manifest.json", MANIFEST)
+    calls = []
+    real_build = cat.build_index
+    monkeypatch.setattr(cat, "build_index", lambda m: calls.append(1) or real_build(m))
+
+    first = cat.get_manifest_index(str(path))
+    assert cat.get_manifest_index(str(path)) is first
+    assert len(calls) == 1
+
+    changed = dict(MANIFEST, levels=MANIFEST["levels"][:1])
+    path.write_text(json.dumps(changed), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    second = cat.get_manifest_index(str(path))
+    assert len(calls) == 2
+    assert list(second.level_by_id) == [1]
+
+
+def test_api_level_cumulative(client, write_json, monkeypatch):
+    from app import routes
+
+    path = write_json("catalog/manifest.json", MANIFEST)
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(path))
+
+    r = client.get("/api/levels/2/cumulative")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert [s["id"] for s in data["signs"]] == ["tack", "bra"]
+    assert [s["id"] for s in data["cumulativeSigns"]] == ["hej", "tack", "bra"]
+
+    assert client.get("/api/levels/9/cumulative").status_code == 404
+
+
+def test_catalog_etag_and_304(client, write_json, monkeypatch):
+    from app import routes
+
+    path = write_json("catalog/manifest.json", MANIFEST)
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(path))
+
+    for url in ("/api/levels", "/api/levels/1", "/api/levels/1/cumulative", "/api/signs"):
+        r = client.get(url)
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+        assert etag and not etag.startswith("W/")
+        assert "no-cache" in r.headers["Cache-Control"]
+
+        r2 = client.get(url, headers={"If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.data == b""
+        assert r2.headers["ETag"] == etag
+
+        assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_catalog_etag_changes_with_content(client, write_json, monkeypatch):
+    from app import routes
+
+    path = write_json("catalog/manifest.json", MANIFEST)
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(path))
+    etag = client.get("/api/signs").headers["ETag"]
+
+    changed = json.loads(json.dumps(MANIFEST))
+    changed["signs"]["hej"]["label"] = "Hej hej"
+    path.write_text(json.dumps(changed), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    r = client.get("/api/signs", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_distractors_etag(client, write_json, monkeypatch):
+    from app import routes
+
+    path = write_json("catalog/distractors.json", {2: ["hej"], 3: []})
+    monkeypatch.setattr(routes, "_distractors_path", lambda: str(path))
+
+    r = client.get("/api/distractors")
+    assert r.get_json() == {"2": ["hej"], "3": []}
+    assert client.get("/api/distractors", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+
+def test_api_bootstrap_default_fields(client, write_json, monkeypatch):
+    from app import routes
+    from app.version import __version__
+
+    mpath = write_json("catalog/manifest.json", MANIFEST)
+    dpath = write_json("catalog/distractors.json", {"2": ["hej"]})
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(mpath))
+    monkeypatch.setattr(routes, "_distractors_path", lambda: str(dpath))
+
+    r = client.get("/api/bootstrap")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["version"] == __version__
+    assert [lvl["id"] for lvl in data["levels"]] == [1, 2, 3]
+    assert data["signs"] == client.get("/api/signs").get_json()["signs"]
+    assert data["distractors"] == {"2": ["hej"]}
+
+    assert client.get("/api/bootstrap", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+
+def test_api_bootstrap_field_selection(client, write_json, monkeypatch):
+    from app import routes
+
+    mpath = write_json("catalog/manifest.json", MANIFEST)
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(mpath))
+
+    r = client.get("/api/bootstrap?fields=levels,version&level=2")
+    data = r.get_json()
+    assert set(data) == {"levels", "version", "level"}
+    assert data["level"] == client.get("/api/levels/2").get_json()
+
+    other = client.get("/api/bootstrap?fields=levels,version&level=1")
+    assert other.headers["ETag"] != r.headers["ETag"]
+
+
+def test_api_bootstrap_errors(client, write_json, monkeypatch):
+    from app import routes
+
+    mpath = write_json("catalog/manifest.json", MANIFEST)
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(mpath))
+
+    assert client.get("/api/bootstrap?fields=signs,bogus").status_code == 400
+    assert client.get("/api/bootstrap?fields=level").status_code == 400
+    assert client.get("/api/bootstrap?level=42").status_code == 404
+    r = client.get("/api/bootstrap?level=abc")
+    assert r.status_code == 400
+    assert r.get_json() == {"error": "level must be an integer"}
+
+
+def test_api_bootstrap_empty_fields_means_defaults(client, write_json, monkeypatch):
+    from app import routes
+
+    mpath = write_json("catalog/manifest.json", MANIFEST)
+    dpath = write_json("catalog/distractors.json", {"2": ["hej"]})
+    monkeypatch.setattr(routes, "_manifest_path", lambda: str(mpath))
+    monkeypatch.setattr(routes, "_distractors_path", lambda: str(dpath))
+
+    assert client.get("/api/bootstrap?fields=").get_json() == client.get("/api/bootstrap").get_json()
+    assert set(client.get("/api/bootstrap?fields=&level=2").get_json()) == {"version", "levels", "signs", "distractors", "level"}
@@ -0,0 +1,202 @@
+import json
+
+import pytest
+
+import testenv  # noqa: F401
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    """Point /api/feedback at a fresh store with a roomy rate limit."""
+    from app import routes
+    from app.ratelimit import RateLimiter, TokenBucketBackend
+
+    path = tmp_path / "feedback.jsonl"
+    monkeypatch.setattr(routes, "_feedback_path", lambda: str(path))
+    monkeypatch.setattr(routes, "limiter", RateLimiter(TokenBucketBackend(), limits={"feedback": (100, 60)}))
+    return path
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_append_writes_one_line_per_entry(tmp_path):
+    from app import feedback
+
+    path = str(tmp_path / "feedback.jsonl")
+    assert feedback.append(path, {"id": "a", "message": "hej"})
+    assert feedback.append(path, {"id": "b", "message": "åäö"})
+
+    assert [e["id"] for e in _lines(tmp_path / "feedback.jsonl")] == ["a", "b"]
+    assert "åäö" in (tmp_path / "feedback.jsonl").read_text(encoding="utf-8")
+
+
+def test_append_refuses_past_cap(tmp_path):
+    from app import feedback
+
+    path = str(tmp_path / "feedback.jsonl")
+    assert [feedback.append(path, {"id": i}, max_entries=2) for i in range(3)] == [True, True, False]
+    assert len(_lines(tmp_path / "feedback.jsonl")) == 2
+
+
+def test_cap_counts_appends_from_other_processes(tmp_path):
+    from app import feedback
+
+    path = tmp_path / "feedback.jsonl"
+    feedback.append(str(path), {"id": 1}, max_entries=3)
+    with open(path, "a", encoding="utf-8") as f:  # another worker's append
+        f.write(json.dumps({"id": 2}) + "\n")
+    assert feedback.append(str(path), {"id": 3}, max_entries=3)
+    assert not feedback.append(str(path), {"id": 4}, max_entries=3)
+
+    path.write_text(json.dumps({"id": 5}) + "\n", encoding="utf-8")  # replaced from a backup
+    assert feedback.append(str(path), {"id": 6}, max_entries=2)
+    assert not feedback.append(str(path), {"id": 7}, max_entries=2)
+
+
+def test_migrate_legacy_moves_array_once(tmp_path, write_json):
+    from app import feedback
+
+    legacy = write_json("feedback.json", [{"id": "old1", "message": "a"}, {"id": "old2", "message": "b"}])
+    path = str(tmp_path / "feedback.jsonl")
+
+    assert feedback.migrate_legacy(str(legacy), path) == 2
+    assert feedback.migrate_legacy(str(legacy), path) == 0
+    assert not legacy.exists()
+    assert (tmp_path / "feedback.json.migrated").exists()
+    assert [e["id"] for e in _lines(tmp_path / "feedback.jsonl")] == ["old1", "old2"]
+
+
+def test_api_feedback_appends_entry(client, store):
+    r = client.post("/api/feedback", json={"message": "  Bra app!  "})
+    assert r.status_code == 200
+    assert r.get_json() == {"ok": True}
+
+    (entry,) = _lines(store)
+    assert entry["message"] == "Bra app!"
+    assert entry["timestamp"].endswith("Z")
+    assert entry["id"]
+
+
+def test_api_feedback_validates_message(client, store):
+    assert client.post("/api/feedback", json={"message": "  "}).status_code == 400
+    assert client.post("/api/feedback", json={"message": "x" * 1001}).status_code == 400
+    assert not store.exists()
+
+
+def test_api_feedback_leaves_legacy_file_alone(client, store, write_json):
+    legacy = write_json("feedback.json", [{"id": "old", "timestamp": "2024-01-01T00:00:00Z", "message": "gammal"}])
+
+    assert client.post("/api/feedback", json={"message": "ny"}).status_code == 200
+    assert [e["message"] for e in _lines(store)] == ["ny"]
+    assert legacy.exists()  # moved only by tools/migrate_feedback.py
+
+
+def test_api_feedback_storage_full(client, store, monkeypatch):
+    from app import feedback
+
+    monkeypatch.setattr(feedback, "MAX_ENTRIES", 1)
+    assert client.post("/api/feedback", json={"message": "first"}).status_code == 200
+    r = client.post("/api/feedback", json={"message": "second"})
+    assert r.status_code == 507
+    assert r.get_json()["error"] == "feedback storage full"
+    assert len(_lines(store)) == 1
+
+
+@pytest.fixture()
+def admin(store, monkeypatch):
+    from app import routes
+
+    monkeypatch.setattr(routes, "ANALYTICS_KEY", "testkey")
+    return {"X-Analytics-Key": "testkey"}
+
+
+def _write_entries(path, days):
+    with open(path, "w", encoding="utf-8") as f:
+        for day in days:
+            f.write(json.dumps({"id": str(day), "timestamp": f"2024-01-{day:02d}T12:00:00.000001Z", "message": f"dag {day}"}) + "\n")
+
+
+def _read(path, **kwargs):
+    from app import feedback
+
+    return [json.loads(line) for line in feedback.read_page(str(path), **kwargs)]
+
+
+def test_read_page_pages_by_cursor(tmp_path):
+    path = tmp_path / "feedback.jsonl"
+    _write_entries(path, range(1, 6))
+
+    first = _read(path, limit=2)
+    assert [e["id"] for e in first[:2]] == ["1", "2"]
+    cursor = int(first[2]["next_cursor"])
+    second = _read(path, cursor=cursor, limit=3)
+    assert [e["id"] for e in second] == ["3", "4", "5"]  # nothing left, so no next_cursor
+
+
+def test_read_page_filters_by_date_range(tmp_path):
+    from datetime import datetime, timezone
+
+    path = tmp_path / "feedback.jsonl"
+    _write_entries(path, range(1, 29))
+    since = datetime(2024, 1, 10, tzinfo=timezone.utc)
+    until = datetime(2024, 1, 13, tzinfo=timezone.utc)
+
+    assert [e["id"] for e in _read(path, since=since, until=until)] == ["10", "11", "12"]
+    assert [e["id"] for e in _read(path, since=datetime(2024, 2, 1, tzinfo=timezone.utc))] == []
+    assert len(_read(path, since=datetime(2023, 1, 1, tzinfo=timezone.utc))) == 28
+
+
+def test_read_page_skips_partial_last_line(tmp_path):
+    path = tmp_path / "feedback.jsonl"
+    _write_entries(path, [1])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "2", "timest')
+    assert [e["id"] for e in _read(path)] == ["1"]
+
+
+def test_read_page_rejects_cursor_inside_a_line(tmp_path):
+    from app import feedback
+
+    path = tmp_path / "feedback.jsonl"
+    _write_entries(path, [1, 2])
+    with pytest.raises(ValueError):
+        next(feedback.read_page(str(path), cursor=5))
+
+
+def test_api_feedback_list_requires_key(client, store, monkeypatch):
+    from app import routes
+
+    monkeypatch.setattr(routes, "ANALYTICS_KEY", "")
+    assert client.get("/api/feedback").status_code == 403
+    monkeypatch.setattr(routes, "ANALYTICS_KEY", "testkey")
+    assert client.get("/api/feedback").status_code == 401
+    assert client.get("/api/feedback?key=testkey").status_code == 200
+
+
+def test_api_feedback_list_streams_pages(client, store, admin):
+    _write_entries(store, range(1, 6))
+
+    r = client.get("/api/feedback?limit=2&since=2024-01-02T00:00:00Z", headers=admin)
+    assert r.status_code == 200
+    assert r.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+    assert [e["id"] for e in lines[:2]] == ["2", "3"]
+
+    r = client.get(f"/api/feedback?cursor={lines[2]['next_cursor']}&until=2024-01-04T23:59:59Z", headers=admin)
+    assert [json.loads(line)["id"] for line in r.get_data(as_text=True).splitlines()] == ["4"]
+
+
+def test_api_feedback_list_rejects_bad_params(client, store, admin):
+    _write_entries(store, [1, 2])
+    assert client.get("/api/feedback?cursor=abc", headers=admin).status_code == 400
+    assert client.get("/api/feedback?cursor=3", headers=admin).status_code == 400
+    assert client.get("/api/feedback?limit=0", headers=admin).status_code == 400
+    assert client.get("/api/feedback?since=yesterday", headers=admin).status_code == 400
+
+
+def test_api_feedback_list_empty_store(client, store, admin):
+    r = client.get("/api/feedback", headers=admin)
+    assert r.status_code == 200
+    assert r.get_data() == b""
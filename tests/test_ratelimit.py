@@ -0,0 +1,106 @@
+import fakeredis
+import pytest
+
+import testenv  # noqa: F401
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """Controllable time for both backends."""
+    import app.ratelimit as rl
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(rl.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rl.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    from app import redis_client
+
+    fake = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(redis_client, "get_client", lambda: fake)
+    return fake
+
+
+def test_token_bucket_limits_and_refills(clock):
+    from app.ratelimit import RateLimiter, TokenBucketBackend
+
+    limiter = RateLimiter(TokenBucketBackend(), limits={"score": (3, 60)})
+    assert [limiter.allow("score", "1.2.3.4") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("score", "5.6.7.8")  # separate identifier
+
+    clock[0] += 20  # one token back (3 per 60s)
+    assert limiter.allow("score", "1.2.3.4")
+    assert not limiter.allow("score", "1.2.3.4")
+
+
+def test_redis_sliding_window_shared_across_limiters(clock, fake_redis):
+    from app.ratelimit import RateLimiter, RedisWindowBackend
+
+    clock[0] = 600.0  # start of a 60s window
+    worker_a = RateLimiter(RedisWindowBackend(), limits={"track": (4, 60)})
+    worker_b = RateLimiter(RedisWindowBackend(), limits={"track": (4, 60)})
+    results = [limiter.allow("track", "ip") for limiter in (worker_a, worker_b, worker_a, worker_b, worker_a)]
+    assert results == [True, True, True, True, False]  # 4 used between the two workers
+
+    clock[0] = 690.0  # halfway into the next window: the previous 4 count as 2
+    assert worker_a.allow("track", "ip") and worker_b.allow("track", "ip")
+    assert not worker_a.allow("track", "ip")
+
+
+def test_redis_backend_falls_back_to_memory(clock, monkeypatch):
+    import redis
+
+    from app import redis_client
+    from app.ratelimit import RateLimiter, RedisWindowBackend, TokenBucketBackend
+
+    def down():
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(redis_client, "get_client", down)
+    limiter = RateLimiter(RedisWindowBackend(), limits={"score": (1, 60)}, fallback=TokenBucketBackend())
+    assert limiter.allow("score", "ip")
+    assert not limiter.allow("score", "ip")
+    assert limiter.stats()["fallback"]["used"] == 2
+
+
+def test_limits_from_env(monkeypatch):
+    from app.ratelimit import DEFAULT_LIMITS, load_limits
+
+    monkeypatch.setenv("RATE_LIMIT_TRACK", "120/30")
+    limits = load_limits()
+    assert limits["track"] == (120, 30)
+    assert limits["score"] == DEFAULT_LIMITS["score"]
+
+
+def test_token_bucket_memory_bounded_under_ip_scan(clock):
+    from app.ratelimit import RateLimiter, TokenBucketBackend
+
+    backend = TokenBucketBackend(max_keys=100)
+    limiter = RateLimiter(backend, limits={"track": (5, 60)})
+    for i in range(1000):
+        limiter.allow("track", f"10.0.{i // 256}.{i % 256}")
+
+    stats = backend.stats()
+    assert stats["keys"] == 100
+    assert stats["evicted_lru"] == 900
+
+
+def test_token_bucket_keeps_recent_and_sweeps_idle(clock):
+    from app.ratelimit import RateLimiter, TokenBucketBackend
+
+    backend = TokenBucketBackend(max_keys=3)
+    limiter = RateLimiter(backend, limits={"score": (1, 60)})
+    assert limiter.allow("score", "a")
+    limiter.allow("score", "b")
+    limiter.allow("score", "c")
+    assert not limiter.allow("score", "a")  # "a" is now the most recently used
+    limiter.allow("score", "d")  # evicts "b", the coldest
+    assert not limiter.allow("score", "a")  # "a" kept its (empty) bucket
+
+    clock[0] += 61  # everything idle for a full window
+    limiter.allow("score", "e")
+    assert backend.stats()["keys"] == 1
+    assert backend.stats()["evicted_idle"] == 3 and backend.stats()["evicted_lru"] == 1
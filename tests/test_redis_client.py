@@ -0,0 +1,98 @@
+import fakeredis
+import pytest
+import redis
+
+import testenv  # noqa: F401
+
+
+@pytest.fixture()
+def breaker(monkeypatch):
+    """Fresh breaker (threshold 2) and metrics for every test."""
+    import app.redis_client as rc
+
+    b = rc.CircuitBreaker(threshold=2, cooldown=60)
+    monkeypatch.setattr(rc, "breaker", b)
+    monkeypatch.setattr(rc, "_metrics", {})
+    return b
+
+
+@pytest.fixture()
+def client_over_fake():
+    from app.redis_client import InstrumentedRedis
+
+    connection_class = getattr(fakeredis, "FakeRedisConnection", None) or fakeredis.FakeConnection  # renamed in newer fakeredis
+    pool = redis.ConnectionPool(connection_class=connection_class, server=fakeredis.FakeServer(), decode_responses=True)
+    return InstrumentedRedis(connection_pool=pool)
+
+
+def test_commands_are_timed(breaker, client_over_fake):
+    from app.redis_client import stats
+
+    client_over_fake.set("k", "v")
+    assert client_over_fake.get("k") == "v"
+    pipe = client_over_fake.pipeline()
+    pipe.incr("n")
+    pipe.execute()
+
+    commands = stats()["commands"]
+    assert commands["SET"]["count"] == 1
+    assert commands["GET"]["count"] == 1
+    assert commands["PIPELINE"]["count"] == 1
+    assert commands["GET"]["max_ms"] >= commands["GET"]["avg_ms"] >= 0
+
+
+def test_breaker_opens_after_consecutive_failures(breaker):
+    from app.redis_client import RedisUnavailable, _guarded
+
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise redis.ConnectionError("refused")
+
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            _guarded("GET", down)
+    assert breaker.is_open()
+
+    # Open breaker rejects without calling Redis at all
+    with pytest.raises(RedisUnavailable):
+        _guarded("GET", down)
+    assert len(calls) == 2
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_trial_call_after_cooldown_closes_it(breaker):
+    from app.redis_client import _guarded
+
+    breaker.failures = breaker.threshold
+    breaker.opened_at = 0.0  # cooldown long past
+    assert _guarded("GET", lambda: "ok") == "ok"
+    assert breaker.stats() == {"open": False, "failures": 0, "rejected": 0}
+
+
+def test_command_errors_do_not_trip_breaker(breaker):
+    from app.redis_client import _guarded
+
+    def wrong_type():
+        raise redis.ResponseError("WRONGTYPE")
+
+    for _ in range(3):
+        with pytest.raises(redis.ResponseError):
+            _guarded("LPUSH", wrong_type)
+    assert not breaker.is_open()
+
+
+def test_routes_answer_503_when_redis_unavailable(client, monkeypatch):
+    from app import routes
+    from app.redis_client import RedisUnavailable
+
+    def unavailable(*args, **kwargs):
+        raise RedisUnavailable("Redis circuit breaker open")
+
+    monkeypatch.setattr(routes, "get_top", unavailable)
+    monkeypatch.setattr(routes, "submit_events", unavailable)
+
+    assert client.get("/api/scores").status_code == 503
+    r = client.post("/api/track", json={"session_id": "s", "event_type": "page_view", "data": {}})
+    assert r.status_code == 503
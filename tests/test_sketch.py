@@ -0,0 +1,50 @@
+import random
+
+import testenv  # noqa: F401
+
+
+def _summary(values):
+    from app import sketch
+
+    summary = {}
+    for v in values:
+        for name in sketch.fields_for(v) + ["n"]:
+            summary[name] = summary.get(name, 0) + 1
+        summary["sum"] = summary.get("sum", 0) + v
+    return summary
+
+
+def test_quantiles_within_relative_accuracy():
+    from app import sketch
+
+    rng = random.Random(7)
+    values = sorted(rng.uniform(1, 300) for _ in range(5000))
+    summary = _summary(values)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(summary, q) - exact) <= exact * sketch.ACCURACY * 1.01
+
+
+def test_merge_matches_single_summary():
+    from app import sketch
+
+    day1, day2 = [0, 2.5, 7, 13.3], [7, 40, 41.2]
+    merged = sketch.merge([_summary(day1), _summary(day2)])
+    assert merged == sketch.merge([_summary(day1 + day2)])
+    assert sketch.describe(merged)["count"] == 7
+
+
+def test_describe_histogram_and_zero_scores():
+    from app import sketch
+
+    result = sketch.describe(sketch.merge([_summary([0, 0, 0, 4.9, 5, 12])]))
+    assert result["p50"] == 0.0
+    assert result["histogram"] == [[0, 4], [5, 1], [10, 1]]
+    assert result["avg"] == round(21.9 / 6, 2)
+
+
+def test_describe_empty():
+    from app import sketch
+
+    assert sketch.describe({}) == {"count": 0, "avg": 0, "p50": None, "p90": None, "p99": None, "histogram": []}
@@ -0,0 +1,21 @@
+"""Analytics maintenance: roll hourly counters up into daily ones, trim raw events past retention.
+
+Run daily from cron (see deployment/PRODUCTION_DEPLOY.md): python tools/compact_analytics.py
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.analytics import compact  # noqa: E402
+
+
+def main():
+    result = compact()
+    print(f"Rolled up {result['rolled_up']} days, trimmed {result['trimmed']} events, set expiry on {result['expiry_set']} daily keys")
+
+
+if __name__ == "__main__":
+    main()
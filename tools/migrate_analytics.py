@@ -0,0 +1,28 @@
+"""Move legacy event lists to streams and rebuild the analytics aggregates and session HLLs.
+
+Run once after deploying (safe to re-run): python tools/migrate_analytics.py [--drop-session-set]
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.analytics import backfill_aggregates, migrate_event_lists, migrate_sessions  # noqa: E402
+
+
+def main():
+    moved = migrate_event_lists()
+    print(f"Moved {sum(moved.values())} events from the legacy lists into streams")
+
+    counts = backfill_aggregates()
+    print(f"Backfilled {counts['signs']} sign completions, {counts['levels']} level starts, {counts['competitions']} competitions")
+
+    # Pass --drop-session-set once the HLL numbers look right
+    counts = migrate_sessions(delete_legacy="--drop-session-set" in sys.argv)
+    print(f"Imported {counts['sessions']} sessions from the legacy set and {counts['events']} events into the session HLLs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Move feedback from the old feedback.json array into the append-only feedback.jsonl.
+
+Run once after deploying (safe to re-run): python tools/migrate_feedback.py [path/to/feedback.json]
+The old file is renamed to <name>.migrated afterwards.
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.feedback import migrate_legacy  # noqa: E402
+
+
+def main():
+    legacy = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "feedback.json")
+    target = os.path.join(ROOT, "feedback.jsonl")
+    if not os.path.exists(legacy):
+        print(f"Nothing to migrate: {legacy} not found")
+        return
+    moved = migrate_legacy(legacy, target)
+    print(f"Moved {moved} feedback entries from {legacy} into {target}")
+
+
+if __name__ == "__main__":
+    main()